@@ -0,0 +1,98 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from bot.models import TgUser
+
+
+VERSION_KEY = 'bot:tg-user-version:{}'
+
+
+class TgUserCache:
+    """
+    Linked ``TgUser`` (with ``user``) by ``chat_id`` in the bot process: LRU of ``maxsize`` entries,
+    each kept at most ``timeout`` seconds.
+
+    An entry keeps the version of its chat in the shared cache (``VERSION_KEY``) it was loaded under;
+    ``invalidate_tg_user`` drops the version, so a change made by another process (the web API
+    linking an account) reaches every bot process with its next message.
+    """
+
+    def __init__(self, maxsize, timeout):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, chat_id):
+        """``(tg_user or None, version)``; a user loaded after the call is stored with this ``version``."""
+        version = get_version(chat_id)
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(chat_id)
+            if entry is not None:
+                expires, entry_version, tg_user = entry
+                if expires > now and entry_version == version:
+                    self.entries.move_to_end(chat_id)
+                    return tg_user, version
+                del self.entries[chat_id]
+        return None, version
+
+    def put(self, chat_id, tg_user, version):
+        with self.lock:
+            self.entries[chat_id] = (time.monotonic() + self.timeout, version, tg_user)
+            self.entries.move_to_end(chat_id)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def discard(self, chat_id):
+        with self.lock:
+            self.entries.pop(chat_id, None)
+
+
+@lru_cache(maxsize=None)
+def get_tg_user_cache():
+    return TgUserCache(settings.TG_USER_CACHE_SIZE, settings.TG_USER_CACHE_TIMEOUT)
+
+
+def get_version(chat_id):
+    key = VERSION_KEY.format(chat_id)
+    version = cache.get(key)
+    if version is None:
+        version = uuid4().hex
+        # Другой процесс мог успеть записать свою версию
+        if not cache.add(key, version, None):
+            version = cache.get(key) or version
+    return version
+
+
+def get_tg_user(chat_id):
+    """``(tg_user, created)`` like ``get_or_create`` with ``tg_user.user`` loaded; linked chats come from the cache."""
+    if not settings.TG_USER_CACHE_TIMEOUT:
+        return TgUser.objects.select_related('user').get_or_create(chat_id=chat_id)
+
+    tg_users = get_tg_user_cache()
+    tg_user, version = tg_users.get(chat_id)
+    if tg_user is not None:
+        return tg_user, False
+    # Версия прочитана до загрузки: изменение между ними сбросит запись при следующем сообщении
+    tg_user, created = TgUser.objects.select_related('user').get_or_create(chat_id=chat_id)
+    if tg_user.user_id is not None:
+        tg_users.put(chat_id, tg_user, version)
+    return tg_user, created
+
+
+def invalidate_tg_user(chat_id):
+    if not settings.TG_USER_CACHE_TIMEOUT:
+        return
+
+    def invalidate():
+        get_tg_user_cache().discard(chat_id)
+        cache.delete(VERSION_KEY.format(chat_id))
+    transaction.on_commit(invalidate)
@@ -0,0 +1,247 @@
+import asyncio
+import json
+import multiprocessing
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import override_settings
+
+from bot.models import TgUser
+from bot.runtime import BotRuntime
+from bot.tg.client import AsyncTgClient
+from bot.tg.transport import get_send_queue
+from bot.workers import WorkerPool
+from core.models import User
+from goals.management.commands._seed import delete_dataset
+
+
+CHAT_ID_BASE = 9_000_000_000
+
+
+class FakeTelegram:
+    """
+    Bot API of the benchmark: ``updates`` echo messages arrive at ``rate`` per second spread over the chats.
+
+    ``getUpdates`` long-polls and forgets updates below ``offset`` like Telegram does; ``sendMessage``
+    answers after ``send_latency`` seconds and records the reply. Runs in its own process (``run``),
+    so the server does not share the interpreter lock with the bot.
+    """
+
+    def __init__(self, updates, chats, rate, send_latency, finished):
+        self.updates = updates
+        self.chats = chats
+        self.rate = rate
+        self.send_latency = send_latency
+        self.condition = threading.Condition()
+        self.started = time.monotonic()
+        self.confirmed = 0
+        self.delivered = {}
+        self.replies = []
+        self.last_seq = {}
+        self.violations = 0
+        self.finished = finished
+
+    def arrived_at(self, update_id):
+        return self.started + update_id / self.rate if self.rate else self.started
+
+    def get_updates(self, offset, timeout):
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            self.confirmed = max(self.confirmed, offset)
+            while True:
+                now = time.monotonic()
+                available = self.updates if not self.rate else min(self.updates, int((now - self.started) * self.rate) + 1)
+                result = [self.update(update_id) for update_id in range(self.confirmed, min(available, self.confirmed + 100))]
+                if result or now >= deadline or self.finished.is_set():
+                    break
+                # Следующее обновление появится не позже чем через 1 / rate
+                self.condition.wait(min(deadline - now, 1 / self.rate if self.rate else deadline - now))
+            for item in result:
+                self.delivered[item["update_id"]] = self.delivered.get(item["update_id"], 0) + 1
+        return result
+
+    def update(self, update_id):
+        chat_id = CHAT_ID_BASE + update_id % self.chats
+        return {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id, "chat": {"id": chat_id, "type": "private"},
+                "from": {"id": chat_id, "is_bot": False, "username": "bench"}, "text": f"m{update_id}",
+            },
+        }
+
+    def send_message(self, chat_id, text):
+        time.sleep(self.send_latency)
+        update_id = int(text[1:])
+        with self.condition:
+            if update_id < self.last_seq.get(chat_id, -1):
+                self.violations += 1
+            self.last_seq[chat_id] = update_id
+            self.replies.append((update_id, time.monotonic()))
+            if len(self.replies) >= self.updates:
+                self.finished.set()
+                self.condition.notify_all()
+        return {"message_id": update_id, "chat": {"id": chat_id, "type": "private"}, "text": text}
+
+    def run(self, ready, results):
+        """Process entry point: put the port to ``ready``, the report to ``results`` once all replies came."""
+        self.started = time.monotonic()
+        server = self.serve()
+        ready.put(server.server_address[1])
+        self.finished.wait()
+        results.put(self.report())
+        server.shutdown()
+
+    def serve(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Заголовки и тело уходят отдельными пакетами: без этого каждый ответ ждёт delayed ACK
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                params = {key: values[0] for key, values in parse_qs(url.query).items()}
+                method = url.path.rsplit("/", 1)[-1]
+                if method == "getUpdates":
+                    result = api.get_updates(int(params.get("offset", 0)), float(params.get("timeout", 0)))
+                elif method == "sendMessage":
+                    result = api.send_message(int(params["chat_id"]), params["text"])
+                else:
+                    result = True
+                body = json.dumps({"ok": True, "result": result}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            def handle_error(self, request, client_address):
+                # Бот закрывает соединения, не дождавшись ответа на long polling
+                if not isinstance(sys.exc_info()[1], ConnectionError):
+                    super().handle_error(request, client_address)
+
+        server = Server(("127.0.0.1", 0), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    def report(self):
+        latencies = sorted((at - self.arrived_at(update_id)) * 1000 for update_id, at in self.replies)
+        duration = max(at for _, at in self.replies) - self.started
+        redelivered = sum(count - 1 for count in self.delivered.values())
+        return {
+            "throughput": len(self.replies) / duration,
+            "p50": statistics.median(latencies),
+            "p95": latencies[int(len(latencies) * 0.95) - 1],
+            "violations": self.violations,
+            "redelivered": redelivered,
+        }
+
+
+class Command(BaseCommand):
+    help = "compare runbot with 1..N workers against a local fake Telegram server"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", default="1,2,4", help="comma separated worker counts, 1 = no worker pool")
+        parser.add_argument("--updates", type=int, default=2000, help="updates per run")
+        parser.add_argument("--chats", type=int, default=50, help="chats the updates are spread over")
+        parser.add_argument("--rate", type=float, default=0, help="updates arriving per second, 0 = all at once")
+        parser.add_argument("--concurrency", type=int, default=8, help="handlers at the same time per process")
+        parser.add_argument("--send-latency", type=float, default=20.0, help="ms before sendMessage answers")
+        parser.add_argument("--db-latency", type=float, default=2.0, help="ms added to every query (network RTT)")
+
+    def handle(self, *args, **options):
+        try:
+            counts = [int(count) for count in options["workers"].split(",")]
+        except ValueError:
+            raise CommandError("--workers must be a comma separated list of numbers")
+
+        # Данные должны быть видны соединениям других потоков и процессов, поэтому фиксируются и удаляются в конце
+        # Остатки прерванного запуска
+        delete_dataset(User.objects.filter(username="bench_bot"))
+        user = User.objects.create(username="bench_bot", password=make_password(None))
+        TgUser.objects.bulk_create([TgUser(chat_id=CHAT_ID_BASE + i, user=user) for i in range(options["chats"])])
+        latency = options["db_latency"] / 1000
+
+        def delay(execute, sql, params, many, context):
+            time.sleep(latency)
+            return execute(sql, params, many, context)
+
+        def add_latency(sender, connection, **kwargs):
+            if delay not in connection.execute_wrappers:
+                connection.execute_wrappers.append(delay)
+
+        connection_created.connect(add_latency)
+        try:
+            for workers in counts:
+                result = self.run(workers, options)
+                self.stdout.write(
+                    f"workers {workers:>2}   {result['throughput']:8.1f} updates/s   "
+                    f"p50 {result['p50']:8.1f} ms   p95 {result['p95']:8.1f} ms   "
+                    f"order violations {result['violations']}   redelivered {result['redelivered']}"
+                )
+        finally:
+            connection_created.disconnect(add_latency)
+            connections.close_all()
+            delete_dataset([user])
+
+    def run(self, workers, options):
+        context = multiprocessing.get_context("fork")
+        finished, ready, results = context.Event(), context.Queue(), context.Queue()
+        api = FakeTelegram(
+            options["updates"], options["chats"], options["rate"], options["send_latency"] / 1000, finished,
+        )
+        connections.close_all()
+        server = context.Process(target=api.run, args=(ready, results), name="bench-bot-telegram", daemon=True)
+        server.start()
+        # Лимиты отправки Telegram здесь не нужны: измеряется сам бот
+        with override_settings(
+            TG_API_URL=f"http://127.0.0.1:{ready.get(timeout=10)}", BOT_TOKEN="bench",
+            TG_SEND_RATE=1e6, TG_SEND_BURST=10 ** 6, TG_CHAT_SEND_RATE=1e6, TG_CHAT_SEND_BURST=10 ** 6,
+        ):
+            get_send_queue.cache_clear()
+            pool = None
+            if workers > 1:
+                pool = WorkerPool(workers, concurrency=options["concurrency"])
+                pool.start()
+            try:
+                asyncio.run(self.run_bot(finished, pool, options))
+                return results.get(timeout=10)
+            finally:
+                if pool is not None:
+                    pool.stop()
+                finished.set()
+                server.join(timeout=10)
+                get_send_queue.cache_clear()
+
+    @staticmethod
+    async def run_bot(finished, pool, options):
+        client = AsyncTgClient("bench")
+        if pool is not None:
+            task = asyncio.create_task(pool.run(client))
+        else:
+            task = asyncio.create_task(BotRuntime(client, concurrency=options["concurrency"]).run())
+        try:
+            while not finished.is_set():
+                if task.done():
+                    task.result()
+                    raise CommandError("the bot stopped before handling all updates")
+                await asyncio.sleep(0.05)
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            await client.close()
@@ -0,0 +1,23 @@
+# Generated by Django 4.1.7 on 2026-10-18 09:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TgUpdate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('update_id', models.BigIntegerField(unique=True)),
+                ('chat_id', models.BigIntegerField()),
+                ('payload', models.JSONField()),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
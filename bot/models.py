@@ -11,3 +11,11 @@ class TgUser(models.Model):
     @staticmethod
     def generate_verification_code():
         return str(uuid4())
+
+
+class TgUpdate(models.Model):
+    """Update received by the webhook, waiting for ``runbot --webhook``; deleted once handled."""
+    update_id = models.BigIntegerField(unique=True)
+    chat_id = models.BigIntegerField()
+    payload = models.JSONField()
+    created = models.DateTimeField(auto_now_add=True)
@@ -0,0 +1,207 @@
+import asyncio
+import logging
+from collections import deque
+from functools import partial
+
+from bot.handlers import UpdateHandler
+from bot.updates import UpdateListener, fetch_updates, delete_updates
+from todolist.db.threads import database_sync_to_async
+
+
+logger = logging.getLogger(__name__)
+
+
+def handle_message(message):
+    handler = UpdateHandler()
+    handler.handle_message(message)
+    return handler.replies
+
+
+class OffsetTracker:
+    """
+    ``getUpdates`` offset that confirms only handled updates: the lowest update still in work.
+
+    Unconfirmed updates come again with every response; ``start()`` tells the new ones apart.
+    """
+
+    def __init__(self):
+        self.in_work = set()
+        self.finished = set()
+        self.next = 0
+
+    @property
+    def offset(self):
+        return min(self.in_work) if self.in_work else self.next
+
+    def start(self, update_id):
+        if update_id < self.offset or update_id in self.in_work or update_id in self.finished:
+            return False
+        self.in_work.add(update_id)
+        self.next = max(self.next, update_id + 1)
+        return True
+
+    def finish(self, update_id):
+        self.in_work.discard(update_id)
+        offset = self.offset
+        self.finished = {finished for finished in self.finished if finished >= offset}
+        if update_id >= offset:
+            self.finished.add(update_id)
+
+
+class BotRuntime:
+    """
+    Bot on asyncio: long polling (``run``) or the webhook queue (``run_webhook``).
+
+    Intake continues while updates are handled. Each chat has its own queue processed by one task,
+    so messages of a chat are answered in order while different chats are served concurrently.
+    Handlers run in worker threads (at most ``concurrency`` at a time, each with its own database
+    connection); their replies are sent by the event loop.
+    """
+
+    poll_retry_delay = 5
+    poll_batch_delay = 0.05
+
+    def __init__(self, client, concurrency=8, poll_timeout=60):
+        self.client = client
+        self.poll_timeout = poll_timeout
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.chats = {}
+        self.tasks = set()
+        self.pending = 0
+
+    async def run(self):
+        """Long polling; Telegram gets an update confirmed only after it is handled."""
+        try:
+            await self.poll(lambda item, on_done: self.dispatch(item.message, on_done))
+        finally:
+            await self.shutdown()
+
+    async def poll(self, dispatch):
+        """Call ``dispatch(update, on_done)`` for every new update; ``on_done()`` commits it."""
+        tracker = OffsetTracker()
+        progress = asyncio.Event()
+
+        def done(update_id):
+            offset = tracker.offset
+            tracker.finish(update_id)
+            if tracker.offset != offset:
+                progress.set()
+
+        while True:
+            try:
+                res = await self.client.get_updates(offset=tracker.offset, timeout=self.poll_timeout)
+            except Exception:
+                # Транспорт уже повторил запрос: ждём и продолжаем опрос
+                logger.exception("getUpdates failed")
+                await asyncio.sleep(self.poll_retry_delay)
+                continue
+            if not res.ok:
+                logger.warning("getUpdates returned an unexpected response")
+                await asyncio.sleep(self.poll_retry_delay)
+                continue
+            # Обновления без сообщения (item None) подтверждаются сразу, иначе offset на них остановится.
+            # start() принимает id по возрастанию
+            items = sorted(
+                [(item.update_id, item) for item in res.result] + [(update_id, None) for update_id in res.skipped],
+                key=lambda pair: pair[0],
+            )
+            new = [(update_id, item) for update_id, item in items if tracker.start(update_id)]
+            for update_id, item in new:
+                if item is None:
+                    done(update_id)
+                else:
+                    dispatch(item, partial(done, update_id))
+            if items and not new:
+                # Неподтверждённые обновления приходят сразу: ждём, пока сдвинется offset,
+                # и даём обработаться ещё нескольким, чтобы не запрашивать их по одному
+                try:
+                    await asyncio.wait_for(progress.wait(), self.poll_retry_delay)
+                    await asyncio.sleep(self.poll_batch_delay)
+                except asyncio.TimeoutError:
+                    pass
+                progress.clear()
+
+    async def run_webhook(self, batch_size=100, idle_timeout=5, shard=None):
+        """
+        Handle updates queued by the webhook view; rows are deleted after their update is handled.
+
+        ``shard=(index, shards)`` takes only the chats of one worker (see ``bot.updates.get_shard``).
+        Only one process reads a shard (or the unsharded queue) at a time, others wait for its lock.
+        """
+        listener = UpdateListener(shard)
+        handled = []
+        # Строки, отданные в обработку и ещё не удалённые. Курсор по id не годится: строки
+        # параллельных запросов вебхука фиксируются не в порядке id, и меньший id может появиться позже
+        in_work = set()
+
+        def done(row_id):
+            handled.append(row_id)
+            listener.wake()
+
+        try:
+            while True:
+                try:
+                    if handled:
+                        ids = handled[:]
+                        await database_sync_to_async(delete_updates)(ids)
+                        del handled[:len(ids)]
+                        in_work.difference_update(ids)
+                    rows = []
+                    # Не набираем больше пачки необработанных обновлений
+                    if self.pending < batch_size and await listener.connect():
+                        rows = await database_sync_to_async(fetch_updates)(
+                            list(in_work), batch_size - self.pending, shard,
+                        )
+                except Exception:
+                    logger.exception("Update queue is not available")
+                    await asyncio.sleep(self.poll_retry_delay)
+                    continue
+                for row_id, update in rows:
+                    in_work.add(row_id)
+                    self.dispatch(update.message, partial(done, row_id))
+                if not rows:
+                    await listener.wait(idle_timeout)
+        finally:
+            await self.shutdown()
+            if handled:
+                await database_sync_to_async(delete_updates)(handled)
+            listener.close()
+
+    def dispatch(self, message, on_done=None):
+        queue = self.chats.get(message.chat.id)
+        if queue is None:
+            queue = self.chats[message.chat.id] = deque()
+            task = asyncio.create_task(self.process_chat(message.chat.id, queue))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+        queue.append((message, on_done))
+        self.pending += 1
+
+    async def process_chat(self, chat_id, queue):
+        try:
+            while queue:
+                message, on_done = queue.popleft()
+                try:
+                    await self.process(message)
+                finally:
+                    self.pending -= 1
+                # При отмене обновление остаётся в очереди
+                if on_done is not None:
+                    on_done()
+        finally:
+            # Между проверкой очереди и удалением нет await: новое сообщение не потеряется
+            del self.chats[chat_id]
+
+    async def process(self, message):
+        try:
+            async with self.semaphore:
+                replies = await database_sync_to_async(handle_message)(message)
+            for text in replies:
+                await self.client.send_message(chat_id=message.chat.id, text=text)
+        except Exception:
+            logger.exception("Update of chat %s failed", message.chat.id)
+
+    async def shutdown(self):
+        """Let the chats finish what is already queued."""
+        if self.tasks:
+            await asyncio.gather(*self.tasks, return_exceptions=True)
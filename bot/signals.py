@@ -0,0 +1,18 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from bot.identity import invalidate_tg_user
+from bot.models import TgUser
+
+
+@receiver(post_save, sender=TgUser)
+def tg_user_saved(sender, instance, created, raw, update_fields, **kwargs):
+    # Новый код подтверждения не меняет привязку
+    if created or raw or update_fields is not None and not {'user', 'chat_id'} & update_fields:
+        return
+    invalidate_tg_user(instance.chat_id)
+
+
+@receiver(post_delete, sender=TgUser)
+def tg_user_deleted(sender, instance, **kwargs):
+    invalidate_tg_user(instance.chat_id)
@@ -1,3 +1,198 @@
-from django.test import TestCase
+import asyncio
 
-# Create your tests here.
+import psycopg2
+from django.core.cache import cache
+from django.db import connections
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from bot.identity import get_tg_user, get_tg_user_cache
+from bot.models import TgUser
+from bot.runtime import BotRuntime, OffsetTracker
+from bot.tg.client import parse_updates
+from bot.updates import UpdateListener
+from core.models import User
+
+
+def message_update(update_id, chat_id=1):
+    return {'update_id': update_id, 'message': {'chat': {'id': chat_id}, 'text': f'm{update_id}'}}
+
+
+class FakeClient:
+    """``get_updates`` answers with ``responses`` one by one, then stops the runtime."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.offsets = []
+
+    async def get_updates(self, offset=0, timeout=60):
+        self.offsets.append(offset)
+        if not self.responses:
+            raise asyncio.CancelledError
+        return parse_updates(self.responses.pop(0))
+
+
+class UpdateListenerTest(TransactionTestCase):
+    def test_one_consumer_per_shard(self):
+        async def check():
+            queue, standby = UpdateListener(), UpdateListener()
+            first, second, second_standby = UpdateListener((0, 2)), UpdateListener((1, 2)), UpdateListener((1, 2))
+            try:
+                self.assertTrue(await queue.connect())
+                with self.assertLogs('bot.updates', 'WARNING'):
+                    self.assertFalse(await standby.connect())
+                    self.assertFalse(await first.connect())
+                queue.close()
+
+                self.assertTrue(await first.connect())
+                self.assertTrue(await second.connect())
+                self.assertFalse(await second_standby.connect())
+                self.assertFalse(await standby.connect())
+                second.close()
+                self.assertTrue(await second_standby.connect())
+            finally:
+                for listener in (queue, standby, first, second, second_standby):
+                    listener.close()
+
+        asyncio.run(check())
+
+    def test_reconnect_after_connection_loss(self):
+        async def check():
+            listener = UpdateListener((0, 1))
+            try:
+                self.assertTrue(await listener.connect())
+                with self.assertLogs('bot.updates', 'WARNING'):
+                    await asyncio.to_thread(self.terminate, listener.connection.get_backend_pid())
+                    for _ in range(50):
+                        if listener.connection is None:
+                            break
+                        await listener.wait(0.1)
+                self.assertIsNone(listener.connection)
+                self.assertTrue(await listener.connect())
+            finally:
+                listener.close()
+
+        asyncio.run(check())
+
+    @staticmethod
+    def terminate(pid):
+        connection = psycopg2.connect(**connections['default'].get_connection_params())
+        try:
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_terminate_backend(%s)', [pid])
+        finally:
+            connection.close()
+
+
+class OffsetTrackerTest(SimpleTestCase):
+    def test_offset_waits_for_lowest_update(self):
+        tracker = OffsetTracker()
+        self.assertEqual([tracker.start(update_id) for update_id in (5, 6, 7)], [True, True, True])
+        self.assertEqual(tracker.offset, 5)
+
+        tracker.finish(7)
+        tracker.finish(6)
+        self.assertEqual(tracker.offset, 5)
+        tracker.finish(5)
+        self.assertEqual(tracker.offset, 8)
+
+    def test_redelivered_updates(self):
+        tracker = OffsetTracker()
+        tracker.start(1)
+        tracker.start(2)
+        tracker.finish(2)
+        # Пока 1 в работе, Telegram присылает 1 и 2 снова: обе уже известны
+        self.assertFalse(tracker.start(1))
+        self.assertFalse(tracker.start(2))
+        self.assertTrue(tracker.start(3))
+        self.assertEqual(tracker.offset, 1)
+
+        tracker.finish(1)
+        tracker.finish(3)
+        self.assertEqual(tracker.offset, 4)
+        self.assertFalse(tracker.start(2))
+        self.assertEqual(tracker.finished, set())
+
+
+class PollTest(SimpleTestCase):
+    def poll(self, responses):
+        client = FakeClient(responses)
+        runtime = BotRuntime(client)
+        runtime.poll_retry_delay = 0
+        dispatched = []
+
+        def dispatch(item, on_done):
+            dispatched.append(item.update_id)
+            on_done()
+
+        with self.assertRaises(asyncio.CancelledError):
+            asyncio.run(runtime.poll(dispatch))
+        return client.offsets, dispatched
+
+    def test_updates_without_message(self):
+        offsets, dispatched = self.poll([
+            {'ok': True, 'result': [message_update(5), {'update_id': 6, 'edited_message': {}}, message_update(7)]},
+            {'ok': True, 'result': [{'update_id': 8, 'callback_query': {}}]},
+        ])
+        self.assertEqual(dispatched, [5, 7])
+        self.assertEqual(offsets, [0, 8, 9])
+
+    def test_invalid_response(self):
+        with self.assertLogs('bot.runtime', 'WARNING'):
+            offsets, dispatched = self.poll([{'ok': False}, {'result': None}, {'ok': True, 'result': [message_update(1)]}])
+        self.assertEqual(dispatched, [1])
+        self.assertEqual(offsets, [0, 0, 0, 2])
+
+
+class VerificationCodeTest(TestCase):
+    @override_settings(TG_API_URL='http://127.0.0.1:9', BOT_TOKEN='test')
+    def test_reply_failure_after_link(self):
+        user = User.objects.create(username='user')
+        tg_user = TgUser.objects.create(chat_id=42, verification_code='code')
+        self.client.force_login(user)
+
+        with self.assertLogs('bot.views'):
+            response = self.client.patch(
+                reverse('bot:verify'), {'verification_code': 'code'}, content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 200)
+        tg_user.refresh_from_db()
+        self.assertEqual(tg_user.user, user)
+
+
+@override_settings(TG_USER_CACHE_TIMEOUT=60)
+class TgUserCacheTest(TestCase):
+    def setUp(self):
+        get_tg_user_cache.cache_clear()
+        cache.clear()
+        self.addCleanup(get_tg_user_cache.cache_clear)
+        self.user = User.objects.create(username='user')
+        self.tg_user = TgUser.objects.create(chat_id=42, user=self.user)
+
+    def test_linked_user_is_cached(self):
+        with self.assertNumQueries(1):
+            get_tg_user(42)
+        with self.assertNumQueries(0):
+            tg_user, created = get_tg_user(42)
+        self.assertEqual((tg_user.user, created), (self.user, False))
+
+    def test_relink_invalidates(self):
+        get_tg_user(42)
+        other = User.objects.create(username='other')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tg_user.user = other
+            self.tg_user.save()
+        self.assertEqual(get_tg_user(42)[0].user, other)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tg_user.verification_code = 'code'
+            self.tg_user.save(update_fields=['verification_code'])
+        with self.assertNumQueries(0):
+            get_tg_user(42)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tg_user.delete()
+        tg_user, created = get_tg_user(42)
+        self.assertTrue(created)
+        self.assertIsNone(tg_user.user)
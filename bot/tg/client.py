@@ -1,31 +1,91 @@
-import requests
+from functools import lru_cache
+
 from django.conf import settings
 from pydantic import ValidationError
 
-from bot.tg.schemas import GetUpdatesResponse, SendMessageResponse
+from bot.tg.schemas import GetUpdatesResponse, SendMessageResponse, UpdateObj
+from bot.tg.transport import Transport, AsyncTransport, RetryPolicy
+
+
+@lru_cache(maxsize=None)
+def get_transport():
+    """Transport shared by the clients of the process: one connection pool and one send queue."""
+    return Transport()
+
+
+@lru_cache(maxsize=None)
+def get_reply_transport():
+    """Transport for replies sent inside a web request: no retries and a short timeout."""
+    return Transport(policy=RetryPolicy(retries=0), timeout=(settings.TG_REPLY_TIMEOUT, settings.TG_REPLY_TIMEOUT))
+
+
+def parse_updates(data):
+    """
+    ``GetUpdatesResponse`` of a getUpdates answer, validating every update on its own.
+
+    An update the schema does not accept goes to ``skipped`` instead of failing the whole batch:
+    otherwise it would come back with every response and block the offset. ``ok`` is false when
+    the answer itself is not valid.
+    """
+    if not isinstance(data, dict) or data.get('ok') is not True or not isinstance(data.get('result'), list):
+        return GetUpdatesResponse(ok=False, result=[])
+    result, skipped = [], []
+    for item in data['result']:
+        try:
+            result.append(UpdateObj.parse_obj(item))
+        except ValidationError:
+            if isinstance(item, dict) and isinstance(item.get('update_id'), int):
+                skipped.append(item['update_id'])
+    return GetUpdatesResponse(ok=True, result=result, skipped=skipped)
 
 
 class TgClient:
-    def __init__(self, token):
+    def __init__(self, token, transport=None):
         self.token = token
+        self.transport = transport or get_transport()
 
     def get_url(self, method: str):
-        return f"https://api.telegram.org/bot{self.token}/{method}"
+        return f"{settings.TG_API_URL}/bot{self.token}/{method}"
 
     def get_updates(self, offset=0, timeout=60):
-        data = self._get(method='getUpdates', offset=offset, timeout=timeout)
-        try:
-            return GetUpdatesResponse(**data)
-        except ValidationError:
-            return GetUpdatesResponse(ok=False, result=[])
+        data = self._get(
+            method='getUpdates', read_timeout=timeout + 10, offset=offset, timeout=timeout,
+            allowed_updates='["message"]',
+        )
+        return parse_updates(data)
 
     def send_message(self, chat_id, text):
         data = self._get(method='sendMessage', chat_id=chat_id, text=text)
         return SendMessageResponse(**data)
 
-    def _get(self, method, **params):
-        url = self.get_url(method)
-        response = requests.get(url, params=params)
-        if not response.ok:
-            raise ValueError
-        return response.json()
+    def set_webhook(self, url, secret_token):
+        return self._get(method='setWebhook', url=url, secret_token=secret_token, allowed_updates='["message"]')
+
+    def _get(self, method, read_timeout=None, **params):
+        chat_id = params.get('chat_id') if method == 'sendMessage' else None
+        return self.transport.call(self.get_url(method), params, chat_id=chat_id, read_timeout=read_timeout)
+
+
+class AsyncTgClient(TgClient):
+    """``TgClient`` for the asyncio bot runtime: the same methods as coroutines over ``AsyncTransport``."""
+
+    def __init__(self, token, transport=None):
+        super().__init__(token, transport or AsyncTransport())
+
+    async def get_updates(self, offset=0, timeout=60):
+        # Long polling: ответ может прийти только через timeout секунд
+        data = await self._get(
+            method='getUpdates', read_timeout=timeout + 10, offset=offset, timeout=timeout,
+            allowed_updates='["message"]',
+        )
+        return parse_updates(data)
+
+    async def send_message(self, chat_id, text):
+        data = await self._get(method='sendMessage', chat_id=chat_id, text=text)
+        return SendMessageResponse(**data)
+
+    async def set_webhook(self, url, secret_token):
+        return await self._get(method='setWebhook', url=url, secret_token=secret_token, allowed_updates='["message"]')
+
+    async def close(self):
+        await self.transport.close()
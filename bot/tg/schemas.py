@@ -18,6 +18,8 @@ class UpdateObj(BaseModel):
 class GetUpdatesResponse(BaseModel):
     ok: bool
     result: list[UpdateObj]
+    # update_id обновлений, которые бот не обрабатывает (без message): их нужно только подтвердить
+    skipped: list[int] = []
 
 
 class SendMessageResponse(BaseModel):
@@ -0,0 +1,208 @@
+import asyncio
+import random
+import threading
+import time
+from functools import lru_cache
+
+import httpx
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+
+class TgApiError(ValueError):
+    """Unsuccessful Bot API call; ``retry_after`` is set for 429 Too Many Requests."""
+
+    def __init__(self, status, description='', retry_after=None):
+        super().__init__(f'{status} {description}'.strip())
+        self.status = status
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self):
+        return self.status == 429 or self.status >= 500
+
+
+def check_response(status, data):
+    """Return the decoded body of a successful call, raise ``TgApiError`` otherwise."""
+    if 200 <= status < 300 and isinstance(data, dict) and data.get('ok', True):
+        return data
+    if not isinstance(data, dict):
+        raise TgApiError(status)
+    parameters = data.get('parameters') or {}
+    raise TgApiError(data.get('error_code', status), data.get('description', ''), parameters.get('retry_after'))
+
+
+class RetryPolicy:
+    """``retries`` extra attempts with full-jitter exponential backoff; ``retry_after`` of a 429 wins."""
+
+    def __init__(self, retries=3, backoff=0.5, backoff_max=30.0):
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+
+    def delay(self, attempt, retry_after=None):
+        if retry_after is not None:
+            # Разносим повторы, чтобы после паузы не отправить всё одной пачкой
+            return retry_after + random.uniform(0, self.backoff)
+        return random.uniform(0, min(self.backoff_max, self.backoff * 2 ** attempt))
+
+
+class TokenBucket:
+    """
+    Token bucket as a virtual schedule (GCRA): ``rate`` sends per second, bursts of ``burst``.
+
+    ``tat`` is the theoretical arrival time of the next send; a send at ``t`` is allowed when
+    ``t >= tat - tolerance``.
+    """
+    __slots__ = ('interval', 'tolerance', 'tat')
+
+    def __init__(self, rate, burst):
+        self.interval = 1 / rate
+        self.tolerance = (burst - 1) * self.interval
+        self.tat = 0.0
+
+    def allowed_at(self):
+        return self.tat - self.tolerance
+
+    def consume(self, at):
+        self.tat = max(self.tat, at) + self.interval
+
+
+class SendQueue:
+    """
+    Outgoing message schedule of the process: a global bucket and a bucket per chat.
+
+    ``reserve(chat_id)`` books the earliest slot allowed by both and returns how long to wait for it,
+    so concurrent senders are served in arrival order and bursts are spread instead of getting 429.
+    """
+    max_chats = 10000
+
+    def __init__(self, rate=30.0, burst=30, chat_rate=1.0, chat_burst=3):
+        self.global_bucket = TokenBucket(rate, burst)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.chats = {}
+        self.lock = threading.Lock()
+
+    def reserve(self, chat_id):
+        now = time.monotonic()
+        with self.lock:
+            chat = self.chat_bucket(chat_id, now)
+            at = max(now, self.global_bucket.allowed_at(), chat.allowed_at())
+            self.global_bucket.consume(at)
+            chat.consume(at)
+        return at - now
+
+    def pause(self, chat_id, seconds):
+        """Hold sends to the chat for ``seconds`` (flood control of Telegram)."""
+        now = time.monotonic()
+        with self.lock:
+            chat = self.chat_bucket(chat_id, now)
+            chat.tat = max(chat.tat, now + seconds + chat.tolerance)
+
+    def chat_bucket(self, chat_id, now):
+        bucket = self.chats.get(chat_id)
+        if bucket is None:
+            if len(self.chats) >= self.max_chats:
+                # Чаты, которым можно писать без ожидания, ничем не отличаются от новых
+                self.chats = {key: value for key, value in self.chats.items() if value.tat > now}
+            bucket = self.chats[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return bucket
+
+
+@lru_cache(maxsize=None)
+def get_send_queue():
+    return SendQueue(
+        rate=settings.TG_SEND_RATE, burst=settings.TG_SEND_BURST,
+        chat_rate=settings.TG_CHAT_SEND_RATE, chat_burst=settings.TG_CHAT_SEND_BURST,
+    )
+
+
+def get_retry_policy():
+    return RetryPolicy(settings.TG_RETRIES, settings.TG_BACKOFF, settings.TG_BACKOFF_MAX)
+
+
+class Transport:
+    """
+    Bot API calls over one keep-alive ``requests.Session`` with timeouts and retries.
+
+    Calls with ``chat_id`` (sending) wait for their slot in the ``SendQueue``. Network errors, 5xx and
+    429 are retried; a retried send may reach the chat twice if only the answer was lost.
+    """
+
+    def __init__(self, send_queue=None, policy=None, timeout=None):
+        self.send_queue = send_queue or get_send_queue()
+        self.policy = policy or get_retry_policy()
+        self.timeout = timeout or (settings.TG_CONNECT_TIMEOUT, settings.TG_READ_TIMEOUT)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=settings.TG_POOL_SIZE)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def call(self, url, params, chat_id=None, read_timeout=None):
+        timeout = (self.timeout[0], read_timeout or self.timeout[1])
+        attempt = 0
+        while True:
+            if chat_id is not None:
+                time.sleep(self.send_queue.reserve(chat_id))
+            try:
+                response = self.session.get(url, params=params, timeout=timeout)
+                return check_response(response.status_code, self.decode(response))
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error, retry_after = e, None
+            except TgApiError as e:
+                if not e.retryable:
+                    raise
+                error, retry_after = e, e.retry_after
+                if retry_after and chat_id is not None:
+                    self.send_queue.pause(chat_id, retry_after)
+            if attempt >= self.policy.retries:
+                raise error
+            time.sleep(self.policy.delay(attempt, retry_after))
+            attempt += 1
+
+    @staticmethod
+    def decode(response):
+        try:
+            return response.json()
+        except ValueError:
+            return None
+
+
+class AsyncTransport:
+    """``Transport`` for the asyncio runtime on a keep-alive ``httpx.AsyncClient``."""
+
+    def __init__(self, send_queue=None, policy=None, timeout=None):
+        self.send_queue = send_queue or get_send_queue()
+        self.policy = policy or get_retry_policy()
+        self.timeout = timeout or (settings.TG_CONNECT_TIMEOUT, settings.TG_READ_TIMEOUT)
+        self.http = httpx.AsyncClient(
+            timeout=httpx.Timeout(self.timeout[1], connect=self.timeout[0]),
+            limits=httpx.Limits(max_connections=settings.TG_POOL_SIZE),
+        )
+
+    async def call(self, url, params, chat_id=None, read_timeout=None):
+        timeout = httpx.Timeout(read_timeout or self.timeout[1], connect=self.timeout[0])
+        attempt = 0
+        while True:
+            if chat_id is not None:
+                await asyncio.sleep(self.send_queue.reserve(chat_id))
+            try:
+                response = await self.http.get(url, params=params, timeout=timeout)
+                return check_response(response.status_code, Transport.decode(response))
+            except httpx.TransportError as e:
+                error, retry_after = e, None
+            except TgApiError as e:
+                if not e.retryable:
+                    raise
+                error, retry_after = e, e.retry_after
+                if retry_after and chat_id is not None:
+                    self.send_queue.pause(chat_id, retry_after)
+            if attempt >= self.policy.retries:
+                raise error
+            await asyncio.sleep(self.policy.delay(attempt, retry_after))
+            attempt += 1
+
+    async def close(self):
+        await self.http.aclose()
@@ -0,0 +1,144 @@
+"""
+Queue of webhook updates in the ``bot_tgupdate`` table.
+
+The webhook view inserts an update and sends ``NOTIFY bot_updates``; ``runbot --webhook`` listens on
+the channel, reads the rows it is not handling yet in id order and deletes them once handled
+(at-least-once delivery).
+
+Rows are not claimed one by one: a chat must be read by a single consumer to keep its messages in
+order. Instead a consumer holds an advisory lock on its part of the queue (``QUEUE_LOCK``) for as long
+as its LISTEN connection lives, and a second consumer of the same part waits as a standby.
+"""
+import asyncio
+import logging
+
+import psycopg2
+from django.db import connection, connections
+from django.db.models.functions import Abs, Mod
+
+from bot.models import TgUpdate
+from bot.tg.schemas import UpdateObj
+
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = 'bot_updates'
+# Ключ advisory-блокировок очереди: (QUEUE_LOCK, 0) - вся очередь, (QUEUE_LOCK, shards << 16 | index) - шард
+QUEUE_LOCK = 0x74677570
+
+
+def enqueue_update(update, payload):
+    """Store a validated update; repeated deliveries of one ``update_id`` are ignored."""
+    TgUpdate.objects.bulk_create(
+        [TgUpdate(update_id=update.update_id, chat_id=update.message.chat.id, payload=payload)],
+        ignore_conflicts=True,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_notify(%s, %s)', [NOTIFY_CHANNEL, ''])
+
+
+def get_shard(chat_id, shards):
+    return abs(chat_id) % shards
+
+
+def fetch_updates(exclude, limit, shard=None):
+    """``(row id, UpdateObj)`` of queued updates except the ``exclude`` ids; ``shard=(index, shards)`` selects chats."""
+    rows = TgUpdate.objects.exclude(id__in=exclude)
+    if shard is not None:
+        rows = rows.alias(shard=Mod(Abs('chat_id'), shard[1])).filter(shard=shard[0])
+    rows = rows.order_by('id').values_list('id', 'payload')[:limit]
+    return [(row_id, UpdateObj(**payload)) for row_id, payload in rows]
+
+
+def delete_updates(ids):
+    TgUpdate.objects.filter(id__in=ids).delete()
+
+
+class UpdateListener:
+    """
+    ``LISTEN bot_updates`` on a dedicated connection, awaited through the event loop.
+
+    The connection also holds the queue lock of ``shard``: the whole queue exclusively without a shard,
+    a shared lock on it and the shard's own lock otherwise. All sharded consumers must use the same
+    number of shards. A dropped connection is closed and reopened by the next ``connect()``.
+    """
+
+    def __init__(self, shard=None):
+        self.shard = shard
+        self.connection = None
+        self.fileno = None
+        self.standby = False
+        self.event = asyncio.Event()
+        self.loop = asyncio.get_running_loop()
+
+    async def connect(self):
+        """Open the connection unless it is open; ``False`` while another consumer holds the lock."""
+        if self.connection is None:
+            connection = await asyncio.to_thread(self.open)
+            if connection is None:
+                if not self.standby:
+                    logger.warning("Update queue%s is read by another process, waiting", self.describe())
+                    self.standby = True
+                return False
+            self.standby = False
+            # После обрыва fileno() закрытого соединения уже недоступен
+            self.connection, self.fileno = connection, connection.fileno()
+            self.loop.add_reader(self.fileno, self.on_readable)
+        return True
+
+    def open(self):
+        connection = psycopg2.connect(**connections['default'].get_connection_params())
+        try:
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                if self.shard is None:
+                    cursor.execute('SELECT pg_try_advisory_lock(%s, 0)', [QUEUE_LOCK])
+                else:
+                    index, shards = self.shard
+                    cursor.execute(
+                        'SELECT pg_try_advisory_lock_shared(%s, 0) AND pg_try_advisory_lock(%s, %s)',
+                        [QUEUE_LOCK, QUEUE_LOCK, shards << 16 | index],
+                    )
+                if not cursor.fetchone()[0]:
+                    connection.close()
+                    return None
+                cursor.execute(f'LISTEN {NOTIFY_CHANNEL}')
+        except Exception:
+            connection.close()
+            raise
+        return connection
+
+    def describe(self):
+        return '' if self.shard is None else f' shard {self.shard[0]}/{self.shard[1]}'
+
+    def on_readable(self):
+        try:
+            self.connection.poll()
+        except psycopg2.Error as e:
+            error = e
+        else:
+            error = 'closed' if self.connection.closed else None
+        if error is None:
+            self.connection.notifies.clear()
+        else:
+            # Соединение потеряно вместе с блокировкой: цикл откроет его заново
+            logger.warning("LISTEN connection%s lost: %s", self.describe(), error)
+            self.close()
+        self.event.set()
+
+    def wake(self):
+        self.event.set()
+
+    async def wait(self, timeout):
+        """Wait for a notification (or ``wake()``) at most ``timeout`` seconds."""
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self.event.clear()
+
+    def close(self):
+        if self.connection is not None:
+            self.loop.remove_reader(self.fileno)
+            self.connection.close()
+            self.connection = self.fileno = None
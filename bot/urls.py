@@ -1,8 +1,9 @@
 from django.urls import path
-from bot.views import VerificationCodeView
+from bot.views import VerificationCodeView, WebhookView
 
 
 
 urlpatterns = [
     path('verify', VerificationCodeView.as_view(), name='verify'),
+    path('webhook', WebhookView.as_view(), name='webhook'),
 ]
\ No newline at end of file
@@ -1,12 +1,23 @@
+import hmac
+import logging
+
+from pydantic import ValidationError
 from rest_framework import generics, permissions
-from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.exceptions import AuthenticationFailed, NotFound, PermissionDenied
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
 from bot.models import TgUser
 from bot.serializers import TgUserSerializer
-from bot.tg.client import TgClient
+from bot.tg.client import TgClient, get_reply_transport
+from bot.tg.schemas import UpdateObj
+from bot.updates import enqueue_update
 from  django.conf import settings
 
+
+logger = logging.getLogger(__name__)
+
+
 class VerificationCodeView(generics.GenericAPIView):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = TgUserSerializer
@@ -23,6 +34,38 @@ class VerificationCodeView(generics.GenericAPIView):
         tg_user.user = request.user
         tg_user.save()
 
-        TgClient(settings.BOT_TOKEN).send_message(chat_id=tg_user.chat_id, text='Bot verified.')
+        # Аккаунт уже привязан: недоставленное подтверждение не повод отвечать ошибкой
+        try:
+            TgClient(settings.BOT_TOKEN, get_reply_transport()).send_message(
+                chat_id=tg_user.chat_id, text='Bot verified.',
+            )
+        except Exception:
+            logger.exception("Verification reply to chat %s failed", tg_user.chat_id)
 
         return Response(TgUserSerializer(tg_user).data)
+
+
+class WebhookView(APIView):
+    """
+    Updates pushed by Telegram (``setWebhook``), queued for ``runbot --webhook``.
+
+    Answers 200 at once, also for updates the bot does not handle: otherwise Telegram redelivers them.
+    """
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request, *args, **kwargs):
+        secret = settings.TG_WEBHOOK_SECRET
+        if not secret:
+            raise NotFound
+        if not hmac.compare_digest(request.headers.get('X-Telegram-Bot-Api-Secret-Token', ''), secret):
+            raise PermissionDenied
+
+        try:
+            update = UpdateObj(**request.data)
+        except (TypeError, ValidationError):
+            # Не сообщение (edited_message, callback_query...)
+            return Response()
+
+        enqueue_update(update, request.data)
+        return Response()
@@ -0,0 +1,142 @@
+"""
+``runbot --workers N``: updates are handled by N processes, each owning the chats of one shard.
+
+In polling mode this process polls Telegram and hands every update to the worker of its chat
+(``get_shard``); workers report handled updates back and only then the offset moves past them. In
+webhook mode every worker reads its shard of the queue table itself. A chat always lands on the
+same worker, whose runtime keeps its messages in order.
+"""
+import asyncio
+import logging
+import multiprocessing
+import threading
+from functools import partial
+
+from django.conf import settings
+from django.db import connections
+
+from bot.runtime import BotRuntime
+from bot.tg.client import AsyncTgClient
+from bot.tg.schemas import UpdateObj
+from bot.tg.transport import AsyncTransport, SendQueue
+from bot.updates import get_shard
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_client(workers):
+    """Client of a worker: the global send rate is split between the workers, chat limits are kept."""
+    send_queue = SendQueue(
+        rate=settings.TG_SEND_RATE / workers, burst=max(1, settings.TG_SEND_BURST // workers),
+        chat_rate=settings.TG_CHAT_SEND_RATE, chat_burst=settings.TG_CHAT_SEND_BURST,
+    )
+    return AsyncTgClient(settings.BOT_TOKEN, AsyncTransport(send_queue=send_queue))
+
+
+def run_worker(index, workers, concurrency, inbox, outbox):
+    """Process entry point: handle ``(update_id, update)`` from ``inbox``, report ids to ``outbox``."""
+    asyncio.run(_run_worker(index, workers, concurrency, inbox, outbox))
+
+
+async def _run_worker(index, workers, concurrency, inbox, outbox):
+    client = get_client(workers)
+    runtime = BotRuntime(client, concurrency=concurrency)
+    try:
+        if inbox is None:
+            await runtime.run_webhook(shard=(index, workers))
+            return
+
+        loop = asyncio.get_running_loop()
+        stopped = asyncio.Event()
+
+        def read():
+            while (item := inbox.get()) is not None:
+                update_id, update = item
+                message = UpdateObj(**update).message
+                loop.call_soon_threadsafe(runtime.dispatch, message, partial(outbox.put, update_id))
+            loop.call_soon_threadsafe(stopped.set)
+
+        threading.Thread(target=read, name=f"runbot-inbox-{index}", daemon=True).start()
+        await stopped.wait()
+        await runtime.shutdown()
+    finally:
+        await client.close()
+
+
+class WorkerPool:
+    """Worker processes; ``start()`` forks them and must be called before the event loop is started."""
+
+    def __init__(self, workers, concurrency=8, webhook=False):
+        self.workers = workers
+        self.concurrency = concurrency
+        self.webhook = webhook
+        self.context = multiprocessing.get_context("fork")
+        self.inboxes = []
+        self.outbox = None
+        self.processes = []
+
+    def start(self):
+        # Соединения родителя не должны достаться детям после fork
+        connections.close_all()
+        self.outbox = None if self.webhook else self.context.Queue()
+        for index in range(self.workers):
+            inbox = None if self.webhook else self.context.Queue()
+            process = self.context.Process(
+                target=run_worker, name=f"runbot-worker-{index}",
+                args=(index, self.workers, self.concurrency, inbox, self.outbox), daemon=True,
+            )
+            process.start()
+            self.inboxes.append(inbox)
+            self.processes.append(process)
+
+    def stop(self):
+        """Polling workers finish the updates they got; webhook workers are stopped at once (rows stay queued)."""
+        for inbox, process in zip(self.inboxes, self.processes):
+            if inbox is not None:
+                inbox.put(None)
+            else:
+                process.terminate()
+        for process in self.processes:
+            process.join(timeout=30)
+            if process.is_alive():
+                process.terminate()
+
+    def check(self):
+        for process in self.processes:
+            if not process.is_alive():
+                raise RuntimeError(f"{process.name} exited with code {process.exitcode}")
+
+    async def run(self, client):
+        """Poll Telegram (or just watch the workers in webhook mode) until a worker dies or the task is cancelled."""
+        if not self.webhook:
+            return await self.poll(client)
+        while True:
+            self.check()
+            await asyncio.sleep(1)
+
+    async def poll(self, client):
+        loop = asyncio.get_running_loop()
+        callbacks = {}
+
+        def read():
+            while (update_id := self.outbox.get()) is not None:
+                loop.call_soon_threadsafe(finish, update_id)
+
+        def finish(update_id):
+            callbacks.pop(update_id)()
+
+        def dispatch(item, on_done):
+            self.check()
+            callbacks[item.update_id] = on_done
+            shard = get_shard(item.message.chat.id, self.workers)
+            self.inboxes[shard].put((item.update_id, item.dict()))
+
+        reader = threading.Thread(target=read, name="runbot-outbox", daemon=True)
+        reader.start()
+        try:
+            await BotRuntime(client).poll(dispatch)
+        finally:
+            # Отчёты, уже пришедшие от воркеров, обрабатываются до остановки цикла
+            self.outbox.put(None)
+            await loop.run_in_executor(None, reader.join)
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 
-from core.models import User
+from core.models import User, RequestProfile
 
 
 @admin.register(User)
@@ -13,3 +13,12 @@ class UserAdmin(UserAdmin):
     exclude = ("password",)
     ordering = ('email',)
 
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ("id", "created", "trigger", "method", "view_name", "status_code", "duration_ms", "queries", "user")
+    list_filter = ("trigger", "view_name")
+    search_fields = ("path",)
+    exclude = ("stats",)
+    readonly_fields = ("created", "user", "trigger", "method", "path", "view_name", "status_code", "duration_ms",
+                       "queries", "sql")
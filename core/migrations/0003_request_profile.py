@@ -0,0 +1,36 @@
+# Generated by Django 4.1.7 on 2026-10-18 09:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_alter_user_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('trigger', models.PositiveSmallIntegerField(choices=[(1, 'По запросу'), (2, 'Медленный запрос')])),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.TextField()),
+                ('view_name', models.CharField(blank=True, max_length=255)),
+                ('status_code', models.PositiveSmallIntegerField()),
+                ('duration_ms', models.FloatField()),
+                ('queries', models.PositiveIntegerField()),
+                ('stats', models.BinaryField()),
+                ('sql', models.JSONField(default=list)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Профиль запроса',
+                'verbose_name_plural': 'Профили запросов',
+            },
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.contrib.auth.models import AbstractUser
+from django.db import models
 
 
 class User(AbstractUser):
@@ -6,4 +7,28 @@ class User(AbstractUser):
 
     class Meta:
         verbose_name = 'Пользователь'
-        verbose_name_plural = 'Пользователи'
\ No newline at end of file
+        verbose_name_plural = 'Пользователи'
+
+
+class RequestProfile(models.Model):
+    """cProfile stats and SQL timeline of one request, captured by ``core.profiling.ProfilingMiddleware``."""
+    class Trigger(models.IntegerChoices):
+        manual = 1, "По запросу"
+        slow = 2, "Медленный запрос"
+
+    created = models.DateTimeField(verbose_name="Дата создания", auto_now_add=True)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    trigger = models.PositiveSmallIntegerField(choices=Trigger.choices)
+    method = models.CharField(max_length=10)
+    path = models.TextField()
+    view_name = models.CharField(max_length=255, blank=True)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    queries = models.PositiveIntegerField()
+    # marshal.dumps(pstats.Stats.stats): формат файлов cProfile, открывается pstats и snakeviz
+    stats = models.BinaryField()
+    sql = models.JSONField(default=list)
+
+    class Meta:
+        verbose_name = "Профиль запроса"
+        verbose_name_plural = "Профили запросов"
@@ -0,0 +1,136 @@
+import cProfile
+import marshal
+import pstats
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.utils.deprecation import MiddlewareMixin
+
+from core.models import RequestProfile
+from todolist.middleware import get_request_timing
+
+
+_current = ContextVar('request_profile', default=None)
+
+
+class ProfileSession:
+    """cProfile of one request: the request thread and every worker thread it uses get their own profiler."""
+
+    def __init__(self):
+        self.profilers = []
+
+    @contextmanager
+    def profile(self):
+        profiler = cProfile.Profile()
+        self.profilers.append(profiler)
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+
+    def dump(self):
+        """Merged stats in the format of ``cProfile`` output files."""
+        stats = pstats.Stats(self.profilers[0])
+        for profiler in self.profilers[1:]:
+            stats.add(profiler)
+        return marshal.dumps(stats.stats)
+
+
+def profiled(func):
+    """Run ``func`` under a profiler of the current request, when it is profiled (for worker threads)."""
+    def wrapper(*args, **kwargs):
+        session = _current.get()
+        if session is None:
+            return func(*args, **kwargs)
+        with session.profile():
+            return func(*args, **kwargs)
+    return wrapper
+
+
+class ProfilingMiddleware(MiddlewareMixin):
+    """
+    Run selected requests under cProfile and store the profile with the SQL timeline as ``RequestProfile``.
+
+    Staff users profile a request with the ``X-Profile`` header or the ``_profile`` query parameter; the
+    id of the stored profile is returned in ``X-Profile-Id``. With ``PROFILING_SLOW_MS`` a share
+    ``PROFILING_SAMPLE_RATE`` of all requests is profiled and kept when slower than the threshold.
+    Put it after ``AuthenticationMiddleware`` (and after ``RequestMetricsMiddleware`` for the SQL timeline).
+    """
+
+    def __call__(self, request):
+        if self._is_coroutine:
+            return self.acall(request)
+        trigger = self.get_trigger(request, request.user.is_staff if self.requested(request) else False)
+        if trigger is None:
+            return self.get_response(request)
+        return self.profile(request, trigger, self.get_response)
+
+    async def acall(self, request):
+        is_staff = False
+        if self.requested(request):
+            is_staff = await sync_to_async(lambda: request.user.is_staff)()
+        trigger = self.get_trigger(request, is_staff)
+        if trigger is None:
+            return await self.get_response(request)
+        # Синхронные представления выполняются в потоке, из которого вызван async_to_sync: профилируем его
+        return await sync_to_async(self.profile)(request, trigger, async_to_sync(self.get_response))
+
+    @staticmethod
+    def requested(request):
+        return 'HTTP_X_PROFILE' in request.META or '_profile' in request.GET
+
+    @staticmethod
+    def get_trigger(request, is_staff):
+        if is_staff:
+            return RequestProfile.Trigger.manual
+        if settings.PROFILING_SLOW_MS and random.random() < settings.PROFILING_SAMPLE_RATE:
+            return RequestProfile.Trigger.slow
+        return None
+
+    def profile(self, request, trigger, get_response):
+        session = ProfileSession()
+        timing = get_request_timing()
+        if timing is not None:
+            timing.sql = []
+        token = _current.set(session)
+        started = time.perf_counter()
+        try:
+            with session.profile():
+                response = get_response(request)
+        finally:
+            _current.reset(token)
+        duration_ms = (time.perf_counter() - started) * 1000
+        sql = []
+        if timing is not None:
+            sql, timing.sql = timing.sql, None
+
+        if trigger == RequestProfile.Trigger.slow and duration_ms < settings.PROFILING_SLOW_MS:
+            return response
+        profile = self.save(request, response, trigger, session, sql, duration_ms)
+        if trigger == RequestProfile.Trigger.manual:
+            response['X-Profile-Id'] = profile.id
+        return response
+
+    @staticmethod
+    def save(request, response, trigger, session, sql, duration_ms):
+        match = getattr(request, 'resolver_match', None)
+        user = getattr(request, 'user', None)
+        profile = RequestProfile.objects.create(
+            user_id=user.id if user is not None and user.is_authenticated else None,
+            trigger=trigger,
+            method=request.method,
+            path=request.get_full_path(),
+            view_name=match.view_name if match is not None else '',
+            status_code=response.status_code,
+            duration_ms=round(duration_ms, 3),
+            queries=len(sql),
+            stats=session.dump(),
+            sql=sql,
+        )
+        RequestProfile.objects.filter(id__lte=profile.id - settings.PROFILING_KEEP).delete()
+        return profile
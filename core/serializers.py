@@ -1,9 +1,13 @@
+import marshal
+
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
-from core.models import User
+from core.models import User, RequestProfile
 from todolist.fields import PasswordField
 
+PROFILE_TOP_FUNCTIONS = 50
+
 
 class CreateUserSerializer(serializers.ModelSerializer):
     password = PasswordField(required=True, write_only=False)
@@ -33,3 +37,30 @@ class LoginSerializer(serializers.Serializer):
 class UpdatePasswordSerializer(serializers.Serializer):
     old_password = PasswordField(required=True)
     new_password = PasswordField(required=True)
+
+
+class RequestProfileSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RequestProfile
+        exclude = ('stats', 'sql')
+
+
+class RequestProfileDetailSerializer(serializers.ModelSerializer):
+    functions = serializers.SerializerMethodField()
+
+    class Meta:
+        model = RequestProfile
+        exclude = ('stats',)
+
+    def get_functions(self, obj):
+        """Top functions by cumulative time."""
+        rows = []
+        for (filename, line, name), (calls, _, tottime, cumtime, _) in marshal.loads(obj.stats).items():
+            rows.append({
+                'function': f'{filename}:{line}({name})',
+                'calls': calls,
+                'tottime_ms': round(tottime * 1000, 3),
+                'cumtime_ms': round(cumtime * 1000, 3),
+            })
+        rows.sort(key=lambda row: row['cumtime_ms'], reverse=True)
+        return rows[:PROFILE_TOP_FUNCTIONS]
@@ -1,10 +1,14 @@
 from django.urls import path
 
-from core.views import SignUpView, LoginView, ProfileView, UpdatePasswordView
+from core.views import SignUpView, LoginView, ProfileView, UpdatePasswordView, RequestProfileListView, \
+    RequestProfileView, RequestProfileDownloadView
 
 urlpatterns = [
     path('signup', SignUpView.as_view(), name='signup'),
     path('login', LoginView.as_view(), name='login'),
     path('profile', ProfileView.as_view(), name='profile'),
     path('update_password', UpdatePasswordView.as_view(), name='update_password'),
+    path('request_profile/list', RequestProfileListView.as_view(), name='request-profile-list'),
+    path('request_profile/<int:pk>', RequestProfileView.as_view(), name='request-profile'),
+    path('request_profile/<int:pk>/download', RequestProfileDownloadView.as_view(), name='request-profile-download'),
 ]
@@ -1,12 +1,14 @@
 from django.contrib.auth import authenticate, login, logout
+from django.http import HttpResponse
 from rest_framework import status
-from rest_framework.generics import GenericAPIView, RetrieveUpdateDestroyAPIView
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.generics import GenericAPIView, RetrieveUpdateDestroyAPIView, ListAPIView, RetrieveAPIView
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
 from rest_framework.exceptions import AuthenticationFailed
 
-from core.models import User
-from core.serializers import CreateUserSerializer, ProfileSerializer, LoginSerializer, UpdatePasswordSerializer
+from core.models import User, RequestProfile
+from core.serializers import CreateUserSerializer, ProfileSerializer, LoginSerializer, UpdatePasswordSerializer, \
+    RequestProfileSerializer, RequestProfileDetailSerializer
 
 
 class SignUpView(GenericAPIView):
@@ -70,3 +72,27 @@ class UpdatePasswordView(GenericAPIView):
         user.save(update_fields=['password'])
 
         return Response(serializer.data)
+
+
+class RequestProfileListView(ListAPIView):
+    serializer_class = RequestProfileSerializer
+    permission_classes = [IsAdminUser]
+    queryset = RequestProfile.objects.defer('stats', 'sql').order_by('-id')
+
+
+class RequestProfileView(RetrieveAPIView):
+    serializer_class = RequestProfileDetailSerializer
+    permission_classes = [IsAdminUser]
+    queryset = RequestProfile.objects.all()
+
+
+class RequestProfileDownloadView(RetrieveAPIView):
+    """The stats as a cProfile file: ``python -m pstats profile.prof`` or snakeviz."""
+    permission_classes = [IsAdminUser]
+    queryset = RequestProfile.objects.all()
+
+    def retrieve(self, request, *args, **kwargs):
+        profile = self.get_object()
+        response = HttpResponse(bytes(profile.stats), content_type='application/octet-stream')
+        response['Content-Disposition'] = f'attachment; filename="profile-{profile.id}.prof"'
+        return response
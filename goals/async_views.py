@@ -0,0 +1,39 @@
+from django.views import View
+
+from core.profiling import profiled
+from goals import views
+from todolist.db.threads import database_sync_to_async
+from todolist.middleware import timed
+
+
+class AsyncListView(View):
+    """
+    Async entry point of a DRF list view for ASGI workers.
+
+    The DRF view runs unchanged (filters, pagination, list cache, ETag, values() serialization), so
+    responses are identical to the sync route, but in a worker thread: one event loop serves
+    many list requests while others wait on Postgres or on slow clients.
+    """
+    list_view = None
+
+    async def get(self, request, *args, **kwargs):
+        # Профиль запроса включает работу в потоке
+        return await database_sync_to_async(profiled(self.render))(request, *args, **kwargs)
+
+    def render(self, request, *args, **kwargs):
+        response = self.list_view.as_view()(request, *args, **kwargs)
+        with timed('render'):
+            response.render()
+        return response
+
+
+class AsyncBoardListView(AsyncListView):
+    list_view = views.BoardListView
+
+
+class AsyncGoalCategoryListView(AsyncListView):
+    list_view = views.GoalCategoryListView
+
+
+class AsyncGoalListView(AsyncListView):
+    list_view = views.GoalListView
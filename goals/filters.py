@@ -1,6 +1,13 @@
+import re
+
 import django_filters
+from django.contrib.postgres.search import SearchQuery, SearchRank
 from django.db import models
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
 from django_filters import rest_framework
+from rest_framework import filters
+from rest_framework.settings import api_settings
 
 from goals.models import Goal
 
@@ -19,3 +26,29 @@ class GoalDateFilter(rest_framework.FilterSet):
         models.DateTimeField: {"filter_class": django_filters.IsoDateTimeFilter},
         models.DateField: {"filter_class": django_filters.IsoDateTimeFilter},
     }
+
+
+class GoalSearchFilter(filters.SearchFilter):
+    """
+    Full-text search over ``Goal.search_vector`` (GIN index) for the ``search`` query parameter.
+
+    Every term is matched as a prefix; without an explicit ``ordering`` results are ranked.
+    """
+    search_config = "russian"
+
+    def filter_queryset(self, request, queryset, view):
+        terms = [re.sub(r"[^\w-]", "", term) for term in self.get_search_terms(request)]
+        terms = [term for term in terms if term]
+        if not terms:
+            return queryset
+
+        query = SearchQuery(
+            " & ".join(f"{term}:*" for term in terms), config=self.search_config, search_type="raw"
+        )
+        queryset = queryset.filter(search_vector=query)
+        if request.query_params.get(api_settings.ORDERING_PARAM):
+            return queryset
+
+        return queryset.annotate(
+            rank=Cast(SearchRank(F("search_vector"), query), FloatField())
+        ).order_by("-rank", "id")
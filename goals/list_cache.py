@@ -0,0 +1,57 @@
+import hashlib
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from goals.membership import get_board_roles
+from goals.models import BoardParticipant, GoalCategory
+
+
+VERSION_KEY = 'goals:list-version:{}:{}'
+RESPONSE_KEY = 'goals:list:{}'
+
+
+def get_list_cache_key(request, name) -> str:
+    """
+    Key of a cached list response of the request user.
+
+    It includes the absolute URL with query parameters, the user's board roles and the current
+    versions of the user and of each of their boards, so bumping a version drops every response
+    that could contain the changed rows without enumerating them.
+    """
+    roles = get_board_roles(request)
+    keys = [VERSION_KEY.format('user', request.user.id), *[VERSION_KEY.format('board', pk) for pk in sorted(roles)]]
+    versions = cache.get_many(keys)
+    missing = {key: uuid4().hex for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+
+    parts = [name, request.build_absolute_uri(), sorted(roles.items()), [versions[key] for key in keys]]
+    return RESPONSE_KEY.format(hashlib.md5(repr(parts).encode()).hexdigest())
+
+
+def invalidate_list_cache(users=(), boards=(), categories=()):
+    """Drop cached lists of ``users`` and of every member of ``boards`` and of boards of ``categories``."""
+    if not settings.GOALS_LIST_CACHE_TIMEOUT:
+        return
+
+    boards = set(boards)
+    categories = set(categories) - {None}
+    if categories:
+        boards.update(GoalCategory.objects.filter(id__in=categories).values_list('board_id', flat=True))
+
+    keys = [VERSION_KEY.format('user', pk) for pk in set(users)] + [VERSION_KEY.format('board', pk) for pk in boards]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_user_boards(user_id):
+    """Drop cached lists that show the profile of ``user_id``."""
+    if not settings.GOALS_LIST_CACHE_TIMEOUT:
+        return
+    invalidate_list_cache(
+        users=[user_id], boards=BoardParticipant.objects.filter(user_id=user_id).values_list('board_id', flat=True)
+    )
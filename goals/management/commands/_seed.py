@@ -0,0 +1,87 @@
+import random
+from collections import Counter
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+
+from core.models import User
+from goals.models import Board, BoardParticipant, GoalCategory, Goal, GoalComment
+
+
+def seed_dataset(users=20, boards=3, categories=5, goals=200, comments=1, seed=0, prefix="bench"):
+    """Bulk-create a small deterministic dataset for benchmarks and return the created users."""
+    rnd = random.Random(seed)
+    password = make_password(None)
+
+    db_users = User.objects.bulk_create(
+        [User(username=f"{prefix}_{seed}_{i}", password=password) for i in range(users)]
+    )
+
+    db_boards, participants = [], []
+    for user in db_users:
+        for i in range(boards):
+            db_boards.append(Board(title=f"board {i}", is_deleted=rnd.random() < 0.1))
+    db_boards = Board.objects.bulk_create(db_boards)
+
+    for n, board in enumerate(db_boards):
+        owner = db_users[n // boards]
+        participants.append(BoardParticipant(board=board, user=owner, role=BoardParticipant.Role.owner))
+        for other in rnd.sample(db_users, min(3, len(db_users))):
+            if other != owner:
+                participants.append(BoardParticipant(board=board, user=other, role=rnd.choice([2, 3])))
+    BoardParticipant.objects.bulk_create(participants, ignore_conflicts=True)
+
+    db_categories = GoalCategory.objects.bulk_create([
+        GoalCategory(
+            title=f"category {i}", board=board, user=db_users[n // boards],
+            is_deleted=board.is_deleted or rnd.random() < 0.1,
+        )
+        for n, board in enumerate(db_boards) for i in range(categories)
+    ])
+
+    batch, goals_count = [], Counter()
+    for category in db_categories:
+        for i in range(goals):
+            batch.append(Goal(
+                title=f"goal {rnd.randrange(10 ** 6)}",
+                description="lorem ipsum " * rnd.randrange(10),
+                category=category,
+                user_id=category.user_id,
+                status=rnd.choices(Goal.Status.values, weights=[3, 2, 2, 5])[0],
+                priority=rnd.choice(Goal.Priority.values),
+                comments_count=comments,
+            ))
+            if batch[-1].status != Goal.Status.archived:
+                goals_count[category.id] += 1
+        if len(batch) >= 5000:
+            _create_goals(batch, comments)
+            batch = []
+    _create_goals(batch, comments)
+
+    for category in db_categories:
+        category.goals_count = goals_count[category.id]
+    GoalCategory.objects.bulk_update(db_categories, ["goals_count"], batch_size=1000)
+
+    return db_users
+
+
+def _create_goals(goals, comments):
+    goals = Goal.objects.bulk_create(goals)
+    GoalComment.objects.bulk_create([
+        GoalComment(goal=goal, user_id=goal.user_id, text="comment") for goal in goals for _ in range(comments)
+    ])
+
+
+def delete_dataset(users):
+    """Remove what ``seed_dataset`` committed for ``users`` (benchmarks that need the data outside a transaction)."""
+    ids = [user.id for user in users]
+    with transaction.atomic():
+        boards = list(BoardParticipant.objects.filter(user_id__in=ids).values_list("board_id", flat=True))
+        # Без сигналов: счётчики и статистика удаляемых категорий не нужны
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM goals_goalcomment WHERE user_id = ANY(%s)", [ids])
+            cursor.execute("DELETE FROM goals_goal WHERE user_id = ANY(%s)", [ids])
+        GoalCategory.objects.filter(board_id__in=boards).delete()
+        BoardParticipant.objects.filter(board_id__in=boards).delete()
+        Board.objects.filter(id__in=boards).delete()
+        User.objects.filter(id__in=ids).delete()
@@ -0,0 +1,99 @@
+import asyncio
+import time
+
+from django.core.management import BaseCommand
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client, override_settings
+from django.urls import path
+
+from goals import async_views, views
+from goals.management.commands._seed import seed_dataset, delete_dataset
+from todolist.db.threads import database_sync_to_async
+
+
+ENDPOINTS = {
+    "board/list": (views.BoardListView, async_views.AsyncBoardListView),
+    "goal_category/list": (views.GoalCategoryListView, async_views.AsyncGoalCategoryListView),
+    "goal/list": (views.GoalListView, async_views.AsyncGoalListView),
+}
+
+# Маршруты бенчмарка: один и тот же список синхронно и асинхронно
+urlpatterns = [
+    route
+    for name, (sync_view, async_view) in ENDPOINTS.items()
+    for route in (path(f"sync/{name}", sync_view.as_view()), path(f"async/{name}", async_view.as_view()))
+]
+
+
+class Command(BaseCommand):
+    help = "compare list throughput of one WSGI worker, sync views under ASGI and async views under ASGI"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200, help="requests per endpoint and mode")
+        parser.add_argument("--concurrency", type=int, default=20, help="concurrent ASGI requests")
+        parser.add_argument("--db-latency", type=float, default=2.0, help="ms added to every query (network RTT)")
+        parser.add_argument("--goals", type=int, default=10, help="goals per category")
+
+    def handle(self, *args, **options):
+        # Данные должны быть видны соединениям других потоков, поэтому фиксируются и удаляются в конце
+        self.stdout.write("seeding...")
+        users = seed_dataset(users=20, goals=options["goals"], prefix="bench_asgi")
+        latency = options["db_latency"] / 1000
+
+        def delay(execute, sql, params, many, context):
+            time.sleep(latency)
+            return execute(sql, params, many, context)
+
+        def add_latency(sender, connection, **kwargs):
+            if delay not in connection.execute_wrappers:
+                connection.execute_wrappers.append(delay)
+
+        connections.close_all()
+        connection_created.connect(add_latency)
+        try:
+            with override_settings(ROOT_URLCONF=__name__):
+                for name in ENDPOINTS:
+                    wsgi = self.run_wsgi(users[0], f"/sync/{name}", options)
+                    asgi_sync = asyncio.run(self.run_asgi(users[0], f"/sync/{name}", options))
+                    asgi_async = asyncio.run(self.run_asgi(users[0], f"/async/{name}", options))
+                    self.stdout.write(
+                        f"{name:<20} wsgi {wsgi:8.1f} req/s   asgi+sync view {asgi_sync:8.1f} req/s   "
+                        f"asgi+async view {asgi_async:8.1f} req/s"
+                    )
+        finally:
+            connection_created.disconnect(add_latency)
+            connections.close_all()
+            delete_dataset(users)
+
+    @staticmethod
+    def run_wsgi(user, url, options):
+        """One sync worker: requests are handled one after another."""
+        client = Client()
+        client.force_login(user)
+        started = time.perf_counter()
+        for _ in range(options["requests"]):
+            assert client.get(url).status_code == 200
+        return options["requests"] / (time.perf_counter() - started)
+
+    @staticmethod
+    async def run_asgi(user, url, options):
+        """One ASGI worker: up to ``concurrency`` requests in flight on its event loop."""
+        client = AsyncClient()
+        await database_login(client, user)
+        queue = asyncio.Queue()
+        for _ in range(options["requests"]):
+            queue.put_nowait(url)
+
+        async def worker():
+            while not queue.empty():
+                response = await client.get(queue.get_nowait())
+                assert response.status_code == 200, response.status_code
+
+        started = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(options["concurrency"])])
+        return options["requests"] / (time.perf_counter() - started)
+
+
+async def database_login(client, user):
+    await database_sync_to_async(client.force_login)(user)
@@ -0,0 +1,78 @@
+import statistics
+import time
+
+from django.core.management import BaseCommand
+from django.db import connection, transaction
+
+from goals.management.commands._seed import seed_dataset
+from goals.models import Board, BoardParticipant, GoalCategory, Goal
+
+
+INDEXES = (
+    "goals_board_active_idx",
+    "goals_participant_user_idx",
+    "goals_category_active_idx",
+    "goals_goal_user_status_idx",
+)
+
+
+class Command(BaseCommand):
+    help = "compare query plans and timings of list endpoints with and without hot path indexes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--goals", type=int, default=100, help="goals per category")
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--plans", action="store_true", help="print EXPLAIN ANALYZE output")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.stdout.write("seeding...")
+            user = seed_dataset(users=options["users"], goals=options["goals"])[0]
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+            sid = transaction.savepoint()
+            with connection.cursor() as cursor:
+                for name in INDEXES:
+                    cursor.execute(f'DROP INDEX "{name}"')
+                cursor.execute("ANALYZE")
+            before = self.measure(user, options)
+            transaction.savepoint_rollback(sid)
+
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+            after = self.measure(user, options)
+
+            for name in before:
+                self.stdout.write(f"{name:<20} before {before[name]:8.2f} ms   after {after[name]:8.2f} ms")
+
+            transaction.set_rollback(True)
+
+    def measure(self, user, options):
+        results = {}
+        for name, queryset in self.get_querysets(user).items():
+            if options["plans"]:
+                self.stdout.write(f"--- {name}\n{queryset.explain(analyze=True, buffers=True)}")
+
+            timings = []
+            for _ in range(options["repeat"]):
+                started = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - started) * 1000)
+            results[name] = statistics.median(timings)
+        return results
+
+    @staticmethod
+    def get_querysets(user):
+        return {
+            "goal/list": Goal.objects.filter(user=user, category__is_deleted=False)
+            .exclude(status=Goal.Status.archived).order_by("title")[:100],
+            "goal_category/list": GoalCategory.objects.filter(board__participants__user=user)
+            .exclude(is_deleted=True).order_by("title")[:100],
+            "board/list": Board.objects.filter(participants__user_id=user.id)
+            .exclude(is_deleted=True).order_by("title")[:100],
+            "board membership": BoardParticipant.objects.filter(
+                user_id=user.id, role=BoardParticipant.Role.owner
+            ).values_list("board_id", flat=True),
+        }
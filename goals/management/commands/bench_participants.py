@@ -0,0 +1,64 @@
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from core.models import User
+from goals.models import Board, BoardParticipant
+from goals.serializers import BoardWithParticipantsSerializer
+
+
+class Command(BaseCommand):
+    help = "compare full rewrite and diff-based sync of board participants"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--participants", type=int, default=10000)
+        parser.add_argument("--changes", type=int, default=10, help="role changes, additions and removals each")
+
+    def handle(self, *args, **options):
+        rnd = random.Random(0)
+        size, changes = options["participants"], options["changes"]
+
+        with transaction.atomic():
+            password = make_password(None)
+            users = User.objects.bulk_create(
+                [User(username=f"bench_participant_{i}", password=password) for i in range(size + changes + 1)]
+            )
+            owner, members, newcomers = users[0], users[1:size + 1 - changes], users[size + 1 - changes:]
+            board = Board.objects.create(title="bench")
+            BoardParticipant.objects.create(board=board, user=owner)
+            BoardParticipant.objects.bulk_create(
+                [BoardParticipant(board=board, user=user, role=rnd.choice([2, 3])) for user in members + users[-changes:]]
+            )
+            members = members + users[-changes:]
+
+            roles = dict(BoardParticipant.objects.filter(board=board).exclude(user=owner).values_list("user_id", "role"))
+            submitted = [{"user": user, "role": roles[user.id]} for user in members[changes:]]
+            for participant in submitted[:changes]:
+                participant["role"] = 5 - participant["role"]
+            submitted += [{"user": user, "role": 3} for user in newcomers[:changes]]
+
+            self.stdout.write(f"board with {len(members) + 1} participants, {changes} changes of each kind")
+            for name, strategy in (("rewrite", self.rewrite), ("diff", self.diff)):
+                sid = transaction.savepoint()
+                started = time.perf_counter()
+                strategy(board, submitted, owner)
+                elapsed = (time.perf_counter() - started) * 1000
+                self.stdout.write(f"{name:<8} {elapsed:9.2f} ms  rows {BoardParticipant.objects.filter(board=board).count()}")
+                transaction.savepoint_rollback(sid)
+
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def rewrite(board, participants, owner):
+        BoardParticipant.objects.filter(board=board).exclude(user=owner).delete()
+        BoardParticipant.objects.bulk_create(
+            [BoardParticipant(user=item["user"], role=item["role"], board=board) for item in participants],
+            ignore_conflicts=True,
+        )
+
+    @staticmethod
+    def diff(board, participants, owner):
+        BoardWithParticipantsSerializer.sync_participants(board, participants, owner)
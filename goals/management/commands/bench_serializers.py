@@ -0,0 +1,70 @@
+import statistics
+import time
+
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from goals.management.commands._seed import seed_dataset
+from goals.models import Board, GoalCategory, Goal, GoalComment
+from goals.serializers import BoardSerializer, GoalCategoryWithUserSerializer, GoalWithUserSerializer, \
+    GoalCommentWithUserSerializer
+from goals.values_serializers import get_values_serializer
+
+
+class Command(BaseCommand):
+    help = "compare list serialization through DRF serializers and values() projections"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1000, help="page size")
+        parser.add_argument("--repeat", type=int, default=10)
+
+    def handle(self, *args, **options):
+        renderer = JSONRenderer()
+        rows = options["rows"]
+
+        with transaction.atomic():
+            self.stdout.write("seeding...")
+            user = seed_dataset(users=5, boards=2, categories=rows // 50 + 1, goals=50)[0]
+
+            cases = {
+                "board/list": (Board.objects.filter(participants__user_id=user.id), BoardSerializer),
+                "goal_category/list": (
+                    GoalCategory.objects.select_related("user").filter(board__participants__user=user),
+                    GoalCategoryWithUserSerializer,
+                ),
+                "goal/list": (Goal.objects.select_related("user").filter(user=user), GoalWithUserSerializer),
+                "goal_comment/list": (
+                    GoalComment.objects.select_related("user").filter(user_id=user.id), GoalCommentWithUserSerializer
+                ),
+            }
+
+            for name, (queryset, serializer_class) in cases.items():
+                queryset = queryset.order_by("id")[:rows]
+                values_serializer = get_values_serializer(serializer_class)
+
+                def drf():
+                    return renderer.render(serializer_class(queryset.all(), many=True).data)
+
+                def values():
+                    return renderer.render(values_serializer.to_representation(values_serializer.project(queryset)))
+
+                if drf() != values():
+                    raise CommandError(f"{name}: output differs")
+
+                drf_ms, values_ms = self.measure(drf, options["repeat"]), self.measure(values, options["repeat"])
+                self.stdout.write(
+                    f"{name:<20} rows {queryset.count():>6}  serializer {drf_ms:8.2f} ms  "
+                    f"values {values_ms:8.2f} ms  x{drf_ms / values_ms:.1f}"
+                )
+
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def measure(func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
@@ -0,0 +1,222 @@
+import copy
+import json
+import math
+import statistics
+import time
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver, reverse
+
+from bot.models import TgUser
+from core.models import RequestProfile
+from core.profiling import ProfileSession
+from goals.management.commands._seed import seed_dataset
+from goals.models import Board, BoardParticipant, GoalCategory, Goal, GoalComment, GoalCategoryStat, ArchiveJob
+
+
+BUDGETS_FILE = Path(settings.BASE_DIR) / "todolist" / "endpoint_budgets.json"
+NAMESPACES = ("core", "goals", "bot")
+PASSWORD = "Budget-check-1"
+WEBHOOK_SECRET = "budget-secret"
+
+
+class Command(BaseCommand):
+    help = "call every API route on a seeded dataset and compare query counts and timings with checked-in budgets"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=50)
+        parser.add_argument("--goals", type=int, default=40, help="goals per category")
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--time-factor", type=float, default=1.0, help="scale latency budgets on slow machines")
+        parser.add_argument("--update", action="store_true", help=f"rewrite {BUDGETS_FILE.name} from this run")
+
+    def handle(self, *args, **options):
+        budgets = {} if options["update"] else json.loads(BUDGETS_FILE.read_text())
+
+        with transaction.atomic():
+            self.stdout.write("seeding...")
+            fixtures = self.seed(options)
+            client = Client(HTTP_HOST="localhost")
+            client.force_login(fixtures["user"])
+
+            scenarios = self.get_scenarios(fixtures)
+            missing = self.get_routes() - {key.split()[0] for key in scenarios}
+            if missing:
+                raise CommandError(f"routes without a budget scenario: {', '.join(sorted(missing))}")
+
+            results = {}
+            with mock.patch("bot.views.TgClient.send_message"), override_settings(TG_WEBHOOK_SECRET=WEBHOOK_SECRET):
+                for key, (method, url, data, *headers) in scenarios.items():
+                    results[key] = self.measure(client, method, url, data, options["repeat"], *headers)
+
+            transaction.set_rollback(True)
+
+        if options["update"]:
+            budgets = {
+                key: {"queries": queries, "ms": math.ceil(ms * 2 + 10)} for key, (queries, ms) in results.items()
+            }
+            BUDGETS_FILE.write_text(json.dumps(budgets, indent=2) + "\n")
+            self.stdout.write(f"{len(budgets)} budgets written to {BUDGETS_FILE}")
+            return
+
+        failures = []
+        for key, (queries, ms) in results.items():
+            budget = budgets.get(key)
+            if budget is None:
+                failures.append(f"{key}: no budget")
+                continue
+            limit = budget["ms"] * options["time_factor"]
+            self.stdout.write(f"{key:<40} {queries:3d}/{budget['queries']:<3d} queries {ms:8.2f}/{limit:.0f} ms")
+            if queries > budget["queries"]:
+                failures.append(f"{key}: {queries} queries, budget {budget['queries']}")
+            if ms > limit:
+                failures.append(f"{key}: {ms:.2f} ms, budget {limit:.0f} ms")
+
+        if failures:
+            raise CommandError("endpoint budgets exceeded:\n" + "\n".join(failures))
+        self.stdout.write(self.style.SUCCESS(f"{len(results)} endpoints within budget"))
+
+    @staticmethod
+    def measure(client, method, url, data, repeat, headers=None):
+        """Run the request ``repeat`` times, each in a rolled back savepoint; return queries and median ms."""
+        headers = headers or {}
+        timings, queries = [], 0
+        cookies = copy.deepcopy(client.cookies)
+        for _ in range(repeat):
+            sid = transaction.savepoint()
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = getattr(client, method)(url, data=data, content_type="application/json", **headers) \
+                    if method != "get" else client.get(url, data, **headers)
+                timings.append((time.perf_counter() - started) * 1000)
+            transaction.savepoint_rollback(sid)
+            # login и logout меняют сессию, а её запись откатывается вместе с савепоинтом
+            client.cookies = copy.deepcopy(cookies)
+
+            if response.status_code >= 400:
+                raise CommandError(f"{method.upper()} {url}: {response.status_code} {response.content[:200]!r}")
+            # Савепоинты теста не относятся к запросу
+            queries = len([q for q in context.captured_queries if "SAVEPOINT" not in q["sql"]])
+        return queries, statistics.median(timings)
+
+    @staticmethod
+    def get_routes():
+        routes = set()
+        for resolver in get_resolver().url_patterns:
+            if isinstance(resolver, URLResolver) and resolver.namespace in NAMESPACES:
+                routes.update(f"{resolver.namespace}:{pattern.name}" for pattern in resolver.url_patterns)
+        return routes
+
+    @staticmethod
+    def seed(options):
+        user = seed_dataset(users=options["users"], goals=options["goals"], prefix="budget")[0]
+        user.set_password(PASSWORD)
+        # staff: профили запросов доступны только персоналу
+        user.is_staff = True
+        user.save(update_fields=["password", "is_staff"])
+        GoalCategoryStat.rebuild()
+
+        board = Board.objects.filter(
+            participants__user=user, participants__role=BoardParticipant.Role.owner, is_deleted=False
+        ).order_by("id").first()
+        category = GoalCategory.objects.filter(board=board, user=user, is_deleted=False).order_by("id").first()
+        goal = Goal.objects.filter(category=category).exclude(status=Goal.Status.archived).order_by("id").first()
+        comment = GoalComment.objects.filter(goal=goal).order_by("id").first()
+        others = BoardParticipant.objects.filter(board=board).exclude(user=user).select_related("user")
+        job = ArchiveJob.objects.create(user=user, board=board, total=goal.category.goals_count)
+        TgUser.objects.create(chat_id=10 ** 12, verification_code="budget-check")
+        session = ProfileSession()
+        with session.profile():
+            reverse("core:profile")
+        profile = RequestProfile.objects.create(
+            user=user, trigger=RequestProfile.Trigger.manual, method="GET", path="/core/profile",
+            view_name="core:profile", status_code=200, duration_ms=1, queries=0, stats=session.dump(),
+        )
+
+        return {
+            "user": user, "board": board, "category": category, "goal": goal, "comment": comment,
+            "participants": [{"user": p.user.username, "role": p.role} for p in others], "job": job,
+            "profile": profile,
+        }
+
+    @staticmethod
+    def get_scenarios(fixtures):
+        """``"<namespace>:<url name> <METHOD> [label]"`` -> (client method, url, data[, headers])."""
+        board, category, goal, comment = fixtures["board"], fixtures["category"], fixtures["goal"], fixtures["comment"]
+
+        def url(name, **kwargs):
+            return reverse(name, kwargs=kwargs or None)
+
+        return {
+            "core:signup POST": ("post", url("core:signup"), {
+                "username": "budget_new", "password": PASSWORD, "password_repeat": PASSWORD,
+            }),
+            "core:login POST": ("post", url("core:login"), {
+                "username": fixtures["user"].username, "password": PASSWORD,
+            }),
+            "core:profile GET": ("get", url("core:profile"), {}),
+            "core:profile PATCH": ("patch", url("core:profile"), {"first_name": "budget"}),
+            "core:profile DELETE": ("delete", url("core:profile"), {}),
+            "core:update_password PUT": ("put", url("core:update_password"), {
+                "old_password": PASSWORD, "new_password": PASSWORD + "2",
+            }),
+            "core:profile GET profiled": ("get", url("core:profile"), {"_profile": 1}),
+            "core:request-profile-list GET": ("get", url("core:request-profile-list"), {}),
+            "core:request-profile GET": ("get", url("core:request-profile", pk=fixtures["profile"].id), {}),
+            "core:request-profile-download GET": (
+                "get", url("core:request-profile-download", pk=fixtures["profile"].id), {},
+            ),
+
+            "bot:verify PATCH": ("patch", url("bot:verify"), {"verification_code": "budget-check"}),
+            "bot:webhook POST": ("post", url("bot:webhook"), {
+                "update_id": 10 ** 9, "message": {"chat": {"id": 10 ** 12}, "text": "/goals"},
+            }, {"HTTP_X_TELEGRAM_BOT_API_SECRET_TOKEN": WEBHOOK_SECRET}),
+
+            "goals:board-create POST": ("post", url("goals:board-create"), {"title": "budget"}),
+            "goals:board-list GET": ("get", url("goals:board-list"), {}),
+            "goals:board GET": ("get", url("goals:board", pk=board.id), {}),
+            "goals:board PUT": ("put", url("goals:board", pk=board.id), {
+                "title": "budget", "participants": fixtures["participants"],
+            }),
+            "goals:board PATCH": ("patch", url("goals:board", pk=board.id), {"title": "budget"}),
+            "goals:board DELETE": ("delete", url("goals:board", pk=board.id), {}),
+            "goals:board-summary GET": ("get", url("goals:board-summary", pk=board.id), {}),
+            "goals:archive-job GET": ("get", url("goals:archive-job", pk=fixtures["job"].id), {}),
+
+            "goals:category-create POST": ("post", url("goals:category-create"), {
+                "title": "budget", "board": board.id,
+            }),
+            "goals:category-list GET": ("get", url("goals:category-list"), {"limit": 100}),
+            "goals:category GET": ("get", url("goals:category", pk=category.id), {}),
+            "goals:category PATCH": ("patch", url("goals:category", pk=category.id), {"title": "budget"}),
+            "goals:category DELETE": ("delete", url("goals:category", pk=category.id), {}),
+
+            "goals:goal-create POST": ("post", url("goals:goal-create"), {
+                "title": "budget", "category": category.id,
+            }),
+            "goals:goal-list GET": ("get", url("goals:goal-list"), {"limit": 100}),
+            "goals:goal-list GET cursor": ("get", url("goals:goal-list"), {"pagination": "cursor", "limit": 100}),
+            "goals:goal-list GET search": ("get", url("goals:goal-list"), {"search": "goal", "limit": 100}),
+            "goals:goal-bulk POST": ("post", url("goals:goal-bulk"), [
+                {"action": "create", "data": {"title": "budget", "category": category.id}},
+                {"action": "update", "id": goal.id, "data": {"title": "budget"}},
+                {"action": "archive", "id": goal.id},
+            ]),
+            "goals:goal GET": ("get", url("goals:goal", pk=goal.id), {}),
+            "goals:goal PATCH": ("patch", url("goals:goal", pk=goal.id), {"title": "budget"}),
+            "goals:goal DELETE": ("delete", url("goals:goal", pk=goal.id), {}),
+
+            "goals:comment-create POST": ("post", url("goals:comment-create"), {"text": "budget", "goal": goal.id}),
+            "goals:comment-list GET": ("get", url("goals:comment-list"), {"limit": 100}),
+            "goals:comment GET": ("get", url("goals:comment", pk=comment.id), {}),
+            "goals:comment PATCH": ("patch", url("goals:comment", pk=comment.id), {"text": "budget"}),
+            "goals:comment DELETE": ("delete", url("goals:comment", pk=comment.id), {}),
+
+            "goals:sync GET": ("get", url("goals:sync"), {}),
+        }
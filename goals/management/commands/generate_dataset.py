@@ -0,0 +1,283 @@
+import io
+import itertools
+import random
+import time
+from array import array
+from datetime import datetime, timedelta, timezone
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.models import User
+from goals.management.commands.reconcile_counters import RECONCILE_GOALS_COUNT
+from goals.models import Board, BoardParticipant, GoalCategory, Goal, GoalComment, GoalCategoryStat
+
+
+WORDS = (
+    "план", "отчёт", "встреча", "спорт", "книга", "ремонт", "релиз", "тест", "идея", "покупки", "курс", "бюджет",
+    "отпуск", "проект", "звонок", "обзор", "бег", "английский", "документы", "здоровье",
+)
+# Доли близки к продовым: большинство целей в работе или выполнены, критических мало
+STATUS_WEIGHTS = {Goal.Status.to_do: 30, Goal.Status.in_progress: 20, Goal.Status.done: 35, Goal.Status.archived: 15}
+PRIORITY_WEIGHTS = {
+    Goal.Priority.low: 20, Goal.Priority.medium: 50, Goal.Priority.high: 22, Goal.Priority.critical: 8,
+}
+BOARDS_PER_USER = (1, 1, 1, 1, 2, 2, 3, 5)
+MEMBERS_PER_BOARD = (0, 0, 0, 1, 1, 2, 3, 5, 10)
+CATEGORIES_PER_BOARD = (1, 2, 3, 3, 4, 5, 8)
+
+
+class RowStream(io.RawIOBase):
+    """File-like object over a generator of COPY text lines, so ``copy_expert`` streams them."""
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.buffer = bytearray()
+        self.rows = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, target):
+        while len(self.buffer) < len(target):
+            chunk = list(itertools.islice(self.lines, 1000))
+            if not chunk:
+                break
+            self.rows += len(chunk)
+            self.buffer += "".join(chunk).encode()
+        size = min(len(target), len(self.buffer))
+        target[:size] = self.buffer[:size]
+        del self.buffer[:size]
+        return size
+
+
+class Command(BaseCommand):
+    help = "bulk-load a large reproducible dataset (users, boards, members, categories, goals, comments) with COPY"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10000)
+        parser.add_argument("--goals", type=int, default=1000000)
+        parser.add_argument("--comments", type=float, default=0.3, help="share of goals with comments")
+        parser.add_argument("--days", type=int, default=365, help="spread of created timestamps")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--prefix", default="gen", help="username prefix")
+        parser.add_argument("--password", help="password of every generated user (unusable when omitted)")
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.seed = options["seed"]
+        self.rnd = random.Random(self.seed)
+        self.now = datetime.now(timezone.utc).replace(microsecond=0)
+        started = time.monotonic()
+
+        if User.objects.filter(username=f"{options['prefix']}_{self.seed}_0").exists():
+            raise CommandError("dataset with this prefix and seed already exists")
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            self.cursor = cursor
+            # Django создаёт внешние ключи DEFERRABLE INITIALLY DEFERRED: без этого проверки миллионов строк
+            # копились бы до COMMIT
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+            self.generate_users()
+            self.generate_boards()
+            self.generate_participants()
+            self.generate_categories()
+            self.generate_goals()
+            self.generate_comments()
+
+            self.step("goal stats", GoalCategoryStat.rebuild)
+            self.step("goals_count", lambda: cursor.execute(RECONCILE_GOALS_COUNT))
+
+        self.step("analyze", lambda: connection.cursor().execute("ANALYZE"))
+        self.stdout.write(self.style.SUCCESS(f"done in {time.monotonic() - started:.0f} s"))
+
+    def step(self, name, func):
+        started = time.monotonic()
+        func()
+        self.stdout.write(f"{name:<14} {time.monotonic() - started:8.1f} s")
+
+    def copy(self, model, columns, lines, count=None):
+        """
+        COPY rows produced by ``lines(first_id)``.
+
+        With ``count`` that many ids are reserved up front so other tables can reference the rows;
+        otherwise the id column is filled by the database.
+        """
+        table = model._meta.db_table
+        started = time.monotonic()
+        if count is not None:
+            first, columns = self.reserve_ids(table, count), ("id", *columns)
+        else:
+            first = None
+        stream = RowStream(lines(first))
+        self.cursor.copy_expert(
+            f"COPY {table} ({', '.join(columns)}) FROM STDIN", io.BufferedReader(stream, 1 << 20), 1 << 20
+        )
+        elapsed = time.monotonic() - started
+        self.stdout.write(f"{table:<24} {stream.rows:>11} rows {elapsed:8.1f} s {stream.rows / elapsed:>10.0f} rows/s")
+        return first
+
+    def reserve_ids(self, table, count):
+        """Advance the id sequence by ``count`` and return the first reserved id."""
+        if not count:
+            return 0
+        self.cursor.execute(f"LOCK TABLE {table} IN EXCLUSIVE MODE")
+        self.cursor.execute(
+            "SELECT setval(pg_get_serial_sequence(%s, 'id'), nextval(pg_get_serial_sequence(%s, 'id')) + %s - 1)",
+            [table, table, count],
+        )
+        return self.cursor.fetchone()[0] - count + 1
+
+    def younger(self, rnd, *ages):
+        """Age in seconds of a row created after all rows of ``ages`` (within ``--days`` without them)."""
+        return rnd.randrange(min(ages, default=max(self.options["days"] * 86400, 1) - 1) + 1)
+
+    def moment(self, age):
+        return (self.now - timedelta(seconds=age)).isoformat()
+
+    @staticmethod
+    def flag(value):
+        return "t" if value else "f"
+
+    def words(self, rnd, count):
+        return " ".join(rnd.choices(WORDS, k=count))
+
+    def generate_users(self):
+        count, prefix = self.options["users"], self.options["prefix"]
+        password = make_password(self.options["password"])
+
+        # Возраст каждой строки хранится, чтобы дочерние строки создавались не раньше родительских
+        self.user_ages = array("l")
+
+        def lines(first):
+            for i in range(count):
+                self.user_ages.append(self.younger(self.rnd))
+                yield f"{first + i}\t{password}\tf\t{prefix}_{self.seed}_{i}\t\t\t\tf\tt\t" \
+                      f"{self.moment(self.user_ages[i])}\n"
+
+        self.first_user = self.copy(
+            User, ("password", "is_superuser", "username", "first_name", "last_name", "email", "is_staff",
+                   "is_active", "date_joined"), lines, count,
+        )
+
+    def generate_boards(self):
+        # Владелец каждой доски: доски пользователя идут подряд
+        self.board_owners = array("q")
+        for user in range(self.options["users"]):
+            self.board_owners.extend([self.first_user + user] * self.rnd.choice(BOARDS_PER_USER))
+        self.deleted_boards = bytearray(len(self.board_owners))
+        self.board_ages = array("l")
+
+        def lines(first):
+            for i, owner in enumerate(self.board_owners):
+                self.deleted_boards[i] = deleted = self.rnd.random() < 0.03
+                self.board_ages.append(self.younger(self.rnd, self.user_ages[owner - self.first_user]))
+                created = self.moment(self.board_ages[i])
+                yield f"{first + i}\t{created}\t{created}\t{self.words(self.rnd, 2)}\t{self.flag(deleted)}\n"
+
+        self.first_board = self.copy(Board, ("created", "updated", "title", "is_deleted"), lines, len(self.board_owners))
+
+    def generate_participants(self):
+        users, user_ages = self.options["users"], self.user_ages
+
+        def lines(first):
+            for i, owner in enumerate(self.board_owners):
+                # Владелец участвует в доске с её создания, остальные добавлены позже
+                board, created = self.first_board + i, self.moment(self.board_ages[i])
+                yield f"{created}\t{created}\t{BoardParticipant.Role.owner}\t{board}\t{owner}\n"
+                members = self.rnd.choice(MEMBERS_PER_BOARD)
+                others = {self.first_user + self.rnd.randrange(users) for _ in range(members)} - {owner}
+                for user in sorted(others):
+                    role = BoardParticipant.Role.writer if self.rnd.random() < 0.3 else BoardParticipant.Role.reader
+                    joined = self.moment(self.younger(self.rnd, self.board_ages[i], user_ages[user - self.first_user]))
+                    yield f"{joined}\t{joined}\t{role}\t{board}\t{user}\n"
+
+        self.copy(BoardParticipant, ("created", "updated", "role", "board_id", "user_id"), lines)
+
+    def generate_categories(self):
+        self.category_boards = array("q")
+        for board in range(len(self.board_owners)):
+            self.category_boards.extend([board] * self.rnd.choice(CATEGORIES_PER_BOARD))
+
+        # Цели распределены по категориям с тяжёлым хвостом: немного категорий с тысячами целей
+        weights = [self.rnd.lognormvariate(0, 1.2) for _ in self.category_boards]
+        scale = self.options["goals"] / sum(weights)
+        self.goal_counts = array("l", (int(weight * scale) for weight in weights))
+        for i in range(self.options["goals"] - sum(self.goal_counts)):
+            self.goal_counts[i % len(self.goal_counts)] += 1
+        del weights
+
+        self.deleted_categories = bytearray(len(self.category_boards))
+        self.category_ages = array("l")
+
+        def lines(first):
+            for i, board in enumerate(self.category_boards):
+                # Как при удалении через API: категории удалённой доски тоже удалены
+                self.deleted_categories[i] = self.rnd.random() < 0.05 or self.deleted_boards[board]
+                self.category_ages.append(self.younger(self.rnd, self.board_ages[board]))
+                created = self.moment(self.category_ages[i])
+                yield f"{first + i}\t{self.words(self.rnd, 1)}\t{self.flag(self.deleted_categories[i])}\t" \
+                      f"{created}\t{created}\t{self.board_owners[board]}\t{self.first_board + board}\t0\n"
+
+        self.first_category = self.copy(
+            GoalCategory, ("title", "is_deleted", "created", "updated", "user_id", "board_id", "goals_count"),
+            lines, len(self.category_boards),
+        )
+
+    def goal_plan(self, category):
+        """
+        ``(age in seconds, comments)`` of each goal of ``category``.
+
+        The same sequence is produced for goals and for comments, so comments are written after their goal.
+        """
+        rnd = random.Random(f"{self.seed}:goals:{category}")
+        share = self.options["comments"]
+        for _ in range(self.goal_counts[category]):
+            age = self.younger(rnd, self.category_ages[category])
+            yield age, 0 if rnd.random() >= share else min(1 + int(rnd.expovariate(0.5)), 20)
+
+    def generate_goals(self):
+        statuses, status_weights = list(STATUS_WEIGHTS), list(STATUS_WEIGHTS.values())
+        priorities, priority_weights = list(PRIORITY_WEIGHTS), list(PRIORITY_WEIGHTS.values())
+
+        def lines(first):
+            goal_id = first
+            for category, board in enumerate(self.category_boards):
+                count = self.goal_counts[category]
+                if not count:
+                    continue
+                user = self.board_owners[board]
+                status = self.rnd.choices(statuses, status_weights, k=count)
+                if self.deleted_categories[category]:
+                    # Цели удалённой категории архивируются вместе с ней
+                    status = [Goal.Status.archived] * count
+                priority = self.rnd.choices(priorities, priority_weights, k=count)
+                for i, (age, comments) in enumerate(self.goal_plan(category)):
+                    created = self.moment(age)
+                    due_date = (self.now + timedelta(days=self.rnd.randrange(-60, 120))).date().isoformat() \
+                        if self.rnd.random() < 0.4 else "\\N"
+                    yield f"{goal_id}\t{created}\t{created}\t{self.words(self.rnd, 3)}\t" \
+                          f"{self.words(self.rnd, self.rnd.randrange(12))}\t{due_date}\t{status[i]}\t{priority[i]}\t" \
+                          f"{self.first_category + category}\t{user}\t{comments}\n"
+                    goal_id += 1
+
+        self.first_goal = self.copy(
+            Goal, ("created", "updated", "title", "description", "due_date", "status", "priority", "category_id",
+                   "user_id", "comments_count"), lines, self.options["goals"],
+        )
+
+    def generate_comments(self):
+        def lines(first):
+            goal_id = self.first_goal
+            for category, board in enumerate(self.category_boards):
+                user = self.board_owners[board]
+                for age, comments in self.goal_plan(category):
+                    for _ in range(comments):
+                        # Комментарии появляются после цели, большинство за последний месяц
+                        created = self.moment(self.rnd.randrange(min(age, 30 * 86400) + 1))
+                        yield f"{created}\t{created}\t{self.words(self.rnd, 6)}\t{goal_id}\t{user}\n"
+                    goal_id += 1
+
+        self.copy(GoalComment, ("created", "updated", "text", "goal_id", "user_id"), lines)
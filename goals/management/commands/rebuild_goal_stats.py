@@ -0,0 +1,13 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from goals.models import GoalCategoryStat
+
+
+class Command(BaseCommand):
+    help = "rebuild goal counts per category, status and priority"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            GoalCategoryStat.rebuild()
+        self.stdout.write(f"{GoalCategoryStat.objects.count()} buckets rebuilt")
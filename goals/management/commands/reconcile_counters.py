@@ -0,0 +1,36 @@
+from django.core.management import BaseCommand
+from django.db import connection, transaction
+
+
+RECONCILE_GOALS_COUNT = """
+UPDATE goals_goalcategory AS category SET goals_count = actual.count
+FROM (
+    SELECT category.id, count(goal.id) AS count
+    FROM goals_goalcategory AS category
+    LEFT JOIN goals_goal AS goal ON goal.category_id = category.id AND goal.status <> 4
+    GROUP BY category.id
+) AS actual
+WHERE category.id = actual.id AND category.goals_count <> actual.count
+"""
+
+RECONCILE_COMMENTS_COUNT = """
+UPDATE goals_goal AS goal SET comments_count = actual.count
+FROM (
+    SELECT goal.id, count(comment.id) AS count
+    FROM goals_goal AS goal
+    LEFT JOIN goals_goalcomment AS comment ON comment.goal_id = goal.id
+    GROUP BY goal.id
+) AS actual
+WHERE goal.id = actual.id AND goal.comments_count <> actual.count
+"""
+
+
+class Command(BaseCommand):
+    help = "repair GoalCategory.goals_count and Goal.comments_count drift"
+
+    def handle(self, *args, **options):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(RECONCILE_GOALS_COUNT)
+            self.stdout.write(f"categories fixed: {cursor.rowcount}")
+            cursor.execute(RECONCILE_COMMENTS_COUNT)
+            self.stdout.write(f"goals fixed: {cursor.rowcount}")
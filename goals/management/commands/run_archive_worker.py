@@ -0,0 +1,56 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db import transaction, close_old_connections
+
+from goals.models import ArchiveJob
+
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = "archive goals of deleted boards and categories in chunks"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=settings.GOALS_ARCHIVE_CHUNK_SIZE)
+        parser.add_argument("--interval", type=float, default=1.0, help="seconds to sleep when the queue is empty")
+        parser.add_argument("--once", action="store_true", help="exit when the queue is empty")
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            try:
+                if self.process_next(options["chunk_size"]):
+                    continue
+            except Exception:
+                # База недоступна или порция не обработана: воркер не должен завершаться
+                logger.exception("Archive worker iteration failed")
+            if options["once"]:
+                break
+            time.sleep(options["interval"])
+
+    def process_next(self, size):
+        # Каждая порция - отдельная транзакция: после падения воркер продолжит с last_goal_id,
+        # а skip_locked позволяет нескольким воркерам разбирать разные задачи
+        with transaction.atomic():
+            job = ArchiveJob.objects.select_for_update(skip_locked=True)\
+                .filter(status__in=[ArchiveJob.Status.pending, ArchiveJob.Status.running]).order_by("id").first()
+            if job is None:
+                return False
+            try:
+                with transaction.atomic():
+                    job.process_chunk(size)
+            except Exception:
+                logger.exception("Archive job #%s: chunk after goal #%s failed", job.id, job.last_goal_id)
+                job.refresh_from_db()
+                job.record_failure(settings.GOALS_ARCHIVE_MAX_ATTEMPTS)
+                if job.status == ArchiveJob.Status.failed:
+                    self.stderr.write(f"job #{job.id}: failed after {job.attempts} attempts")
+                # Следующая попытка после паузы, а не сразу
+                return False
+
+        if job.status == ArchiveJob.Status.done:
+            self.stdout.write(f"job #{job.id}: {job.archived} goals archived")
+        return True
@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from goals.models import BoardParticipant
+
+
+CACHE_KEY = 'goals:board-roles:{}'
+
+
+def get_board_roles(request) -> dict[int, int]:
+    """Return ``{board_id: role}`` of the request user, loaded once per request."""
+    http_request = getattr(request, '_request', request)
+    roles = getattr(http_request, '_board_roles', None)
+    if roles is None:
+        roles = load_board_roles(request.user.id)
+        http_request._board_roles = roles
+    return roles
+
+
+def has_board_role(request, board_id, roles=None) -> bool:
+    role = get_board_roles(request).get(board_id)
+    return role is not None and (roles is None or role in roles)
+
+
+def load_board_roles(user_id) -> dict[int, int]:
+    timeout = settings.BOARD_MEMBERSHIP_CACHE_TIMEOUT
+    if timeout:
+        roles = cache.get(CACHE_KEY.format(user_id))
+        if roles is not None:
+            return roles
+
+    roles = dict(BoardParticipant.objects.filter(user_id=user_id).values_list('board_id', 'role'))
+    if timeout:
+        cache.set(CACHE_KEY.format(user_id), roles, timeout)
+    return roles
+
+
+def invalidate_board_roles(*user_ids):
+    if not settings.BOARD_MEMBERSHIP_CACHE_TIMEOUT or not user_ids:
+        return
+    keys = [CACHE_KEY.format(user_id) for user_id in set(user_ids)]
+    transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,29 @@
+# Generated by Django 4.1.7 on 2026-10-18 08:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0006_alter_goalcategory_board'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='board',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['title'], name='goals_board_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='boardparticipant',
+            index=models.Index(fields=['user', 'board', 'role'], name='goals_participant_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='goal',
+            index=models.Index(fields=['user', 'status'], name='goals_goal_user_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='goalcategory',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['board', 'title'], name='goals_category_active_idx'),
+        ),
+    ]
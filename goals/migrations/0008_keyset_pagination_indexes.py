@@ -0,0 +1,21 @@
+# Generated by Django 4.1.7 on 2026-10-18 08:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0007_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='goal',
+            index=models.Index(fields=['user', 'title', 'id'], name='goals_goal_user_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='goalcomment',
+            index=models.Index(fields=['user', 'created', 'id'], name='goals_comment_user_created_idx'),
+        ),
+    ]
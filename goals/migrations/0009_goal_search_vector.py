@@ -0,0 +1,47 @@
+# Generated by Django 4.1.7 on 2026-10-18 08:52
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+CREATE_TRIGGER = '''
+CREATE FUNCTION goals_goal_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('pg_catalog.russian', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('pg_catalog.russian', coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER goals_goal_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, description, search_vector ON goals_goal
+    FOR EACH ROW EXECUTE FUNCTION goals_goal_search_vector_update();
+
+UPDATE goals_goal SET search_vector = NULL;
+'''
+
+DROP_TRIGGER = '''
+DROP TRIGGER IF EXISTS goals_goal_search_vector_trigger ON goals_goal;
+DROP FUNCTION IF EXISTS goals_goal_search_vector_update();
+'''
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0008_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='goal',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='goal',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='goals_goal_search_vector_idx'),
+        ),
+        migrations.RunSQL(CREATE_TRIGGER, DROP_TRIGGER),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.1.7 on 2026-10-18 08:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0009_goal_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='goal',
+            index=models.Index(fields=['user', 'updated'], name='goals_goal_user_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.1.7 on 2026-10-18 08:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0010_goal_user_updated_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GoalCategoryStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.PositiveSmallIntegerField(choices=[(1, 'К выполнению'), (2, 'В процессе'), (3, 'Выполнено'), (4, 'Архив')])),
+                ('priority', models.PositiveSmallIntegerField(choices=[(1, 'Низкий'), (2, 'Средний'), (3, 'Высокий'), (4, 'Критический')])),
+                ('count', models.IntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='goals.goalcategory')),
+            ],
+            options={
+                'verbose_name': 'Статистика категории',
+                'verbose_name_plural': 'Статистика категорий',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='goalcategorystat',
+            constraint=models.UniqueConstraint(fields=('category', 'status', 'priority'), name='goals_stat_unique_bucket'),
+        ),
+        migrations.RunSQL(
+            '''
+            INSERT INTO goals_goalcategorystat (category_id, status, priority, count)
+            SELECT category_id, status, priority, count(*) FROM goals_goal GROUP BY 1, 2, 3
+            ''',
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.1.7 on 2026-10-18 08:57
+
+from django.db import migrations, models
+
+RECONCILE_GOALS_COUNT = """
+UPDATE goals_goalcategory AS category SET goals_count = actual.count
+FROM (
+    SELECT category.id, count(goal.id) AS count
+    FROM goals_goalcategory AS category
+    LEFT JOIN goals_goal AS goal ON goal.category_id = category.id AND goal.status <> 4
+    GROUP BY category.id
+) AS actual
+WHERE category.id = actual.id AND category.goals_count <> actual.count
+"""
+
+RECONCILE_COMMENTS_COUNT = """
+UPDATE goals_goal AS goal SET comments_count = actual.count
+FROM (
+    SELECT goal.id, count(comment.id) AS count
+    FROM goals_goal AS goal
+    LEFT JOIN goals_goalcomment AS comment ON comment.goal_id = goal.id
+    GROUP BY goal.id
+) AS actual
+WHERE goal.id = actual.id AND goal.comments_count <> actual.count
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0011_goal_category_stat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='goal',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='goalcategory',
+            name='goals_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Активных целей'),
+        ),
+        migrations.RunSQL(RECONCILE_GOALS_COUNT, migrations.RunSQL.noop),
+        migrations.RunSQL(RECONCILE_COMMENTS_COUNT, migrations.RunSQL.noop),
+    ]
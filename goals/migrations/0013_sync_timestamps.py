@@ -0,0 +1,36 @@
+# Generated by Django 4.1.7 on 2026-10-18 08:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0012_goal_counters'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='goalcomment',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, verbose_name='Дата создания'),
+        ),
+        migrations.AlterField(
+            model_name='goalcomment',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата последнего обновления'),
+        ),
+        # До этой миграции auto_now и auto_now_add были перепутаны: меняем значения местами
+        migrations.RunSQL(
+            'UPDATE goals_goalcomment SET created = updated, updated = created',
+            'UPDATE goals_goalcomment SET created = updated, updated = created',
+        ),
+        migrations.AddIndex(
+            model_name='goalcategory',
+            index=models.Index(fields=['board', 'updated'], name='goals_category_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='goalcomment',
+            index=models.Index(fields=['user', 'updated'], name='goals_comment_user_updated_idx'),
+        ),
+    ]
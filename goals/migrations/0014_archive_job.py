@@ -0,0 +1,39 @@
+# Generated by Django 4.1.7 on 2026-10-18 09:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('goals', '0013_sync_timestamps'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchiveJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Дата последнего обновления')),
+                ('status', models.PositiveSmallIntegerField(choices=[(1, 'В очереди'), (2, 'Выполняется'), (3, 'Завершено')], default=1)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('archived', models.PositiveIntegerField(default=0)),
+                ('last_goal_id', models.BigIntegerField(default=0)),
+                ('board', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='archive_jobs', to='goals.board')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='archive_jobs', to='goals.goalcategory')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archive_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Архивация',
+                'verbose_name_plural': 'Архивации',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivejob',
+            index=models.Index(condition=models.Q(('status__in', [1, 2])), fields=['id'], name='goals_archivejob_pending_idx'),
+        ),
+    ]
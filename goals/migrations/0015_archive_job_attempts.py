@@ -0,0 +1,23 @@
+# Generated by Django 4.1.7 on 2026-10-18 10:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0014_archive_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivejob',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='archivejob',
+            name='status',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'В очереди'), (2, 'Выполняется'), (3, 'Завершено'), (4, 'Ошибка')], default=1),
+        ),
+    ]
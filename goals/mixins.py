@@ -0,0 +1,113 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Sum
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from goals.list_cache import get_list_cache_key
+from goals.serializers import ArchiveJobSerializer
+from goals.values_serializers import get_values_serializer
+from todolist.middleware import timed
+
+
+class ValuesListMixin:
+    """List action that serializes ``values()`` rows instead of model instances."""
+
+    def list(self, request, *args, **kwargs):
+        values_serializer = get_values_serializer(self.get_serializer_class())
+        queryset = values_serializer.project(self.filter_queryset(self.get_queryset()))
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            with timed('serialize'):
+                data = values_serializer.to_representation(page)
+            return self.get_paginated_response(data)
+
+        queryset = list(queryset)
+        with timed('serialize'):
+            data = values_serializer.to_representation(queryset)
+        return Response(data)
+
+
+class CachedListMixin:
+    """
+    Keep list responses of each user in the Django cache for ``GOALS_LIST_CACHE_TIMEOUT`` seconds.
+
+    Entries are dropped through ``goals.list_cache.invalidate_list_cache`` (signals and bulk writes).
+    Put it before ``ConditionalGetMixin``: a cached ETag is answered without aggregate queries.
+    """
+
+    def get_cached_list(self, request):
+        if not settings.GOALS_LIST_CACHE_TIMEOUT:
+            return None, None
+        if not hasattr(self, '_list_cache'):
+            key = get_list_cache_key(request, type(self).__name__)
+            self._list_cache = key, cache.get(key)
+        return self._list_cache
+
+    def get_etag(self, request):
+        key, entry = self.get_cached_list(request)
+        if entry is not None:
+            return entry['etag']
+        self._list_etag = super().get_etag(request)
+        return self._list_etag
+
+    def list(self, request, *args, **kwargs):
+        key, entry = self.get_cached_list(request)
+        if entry is not None:
+            return Response(entry['data'])
+
+        response = super().list(request, *args, **kwargs)
+        if key is not None and response.status_code == status.HTTP_200_OK:
+            entry = {'data': response.data, 'etag': getattr(self, '_list_etag', None)}
+            cache.set(key, entry, settings.GOALS_LIST_CACHE_TIMEOUT)
+        return response
+
+
+class ConditionalGetMixin:
+    """
+    Answer ``GET`` with ``304 Not Modified`` when ``If-None-Match`` matches the current ETag.
+
+    The ETag is built from ``max(updated)``, ``count`` and ``sum(id)`` of every queryset returned by
+    ``get_etag_querysets()`` (an empty list disables it), so it is computed without fetching or
+    serializing rows.
+    Writes that use ``QuerySet.update()`` must set ``updated`` explicitly.
+    """
+
+    def get_etag_querysets(self):
+        return []
+
+    def get_etag(self, request):
+        querysets = self.get_etag_querysets()
+        if not querysets:
+            return None
+
+        user = request.user
+        parts = [user.pk, user.username, user.first_name, user.last_name, user.email, request.get_full_path()]
+        for queryset in querysets:
+            state = queryset.aggregate(updated=Max('updated'), count=Count('id'), ids=Sum('id'))
+            parts.extend((state['updated'], state['count'], state['ids']))
+        return quote_etag(hashlib.md5(repr(parts).encode()).hexdigest())
+
+    def get(self, request, *args, **kwargs):
+        etag = self.get_etag(request)
+        if etag is not None and etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        response = super().get(request, *args, **kwargs)
+        if etag is not None and response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+        return response
+
+
+class ArchiveDestroyMixin:
+    """``perform_destroy`` may return an ArchiveJob: then ``202 Accepted`` with its progress replaces ``204``."""
+
+    def destroy(self, request, *args, **kwargs):
+        job = self.perform_destroy(self.get_object())
+        if job is None:
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        return Response(ArchiveJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
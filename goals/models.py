@@ -1,4 +1,10 @@
-from django.db import models
+from collections import Counter
+
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.core.exceptions import EmptyResultSet
+from django.db import models, connection, transaction
+from django.utils import timezone
 from core.models import User
 
 
@@ -6,9 +12,21 @@ class BaseModel(models.Model):
     created = models.DateTimeField(verbose_name="Дата создания", auto_now_add=True)
     updated = models.DateTimeField(verbose_name="Дата последнего обновления", auto_now=True)
 
+    # Счетчики обновляются через F(), поэтому полное сохранение их не перезаписывает
+    counter_fields = ()
+
     class Meta:
         abstract = True
 
+    def save(self, *args, **kwargs):
+        if self.counter_fields and not self._state.adding and not kwargs.get('force_insert') \
+                and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
 
 class Board(BaseModel):
     title = models.CharField(verbose_name="Название", max_length=255)
@@ -17,6 +35,9 @@ class Board(BaseModel):
     class Meta:
         verbose_name = "Доска"
         verbose_name_plural = "Доски"
+        indexes = [
+            models.Index(fields=["title"], condition=models.Q(is_deleted=False), name="goals_board_active_idx"),
+        ]
 
 
 class BoardParticipant(BaseModel):
@@ -24,6 +45,9 @@ class BoardParticipant(BaseModel):
         unique_together = ("board", "user")
         verbose_name = "Участник"
         verbose_name_plural = "Участники"
+        indexes = [
+            models.Index(fields=["user", "board", "role"], name="goals_participant_user_idx"),
+        ]
 
     class Role(models.IntegerChoices):
         owner = 1, "Владелец"
@@ -41,17 +65,57 @@ class GoalCategory(BaseModel):
     class Meta:
         verbose_name = "Категория"
         verbose_name_plural = "Категории"
+        indexes = [
+            models.Index(
+                fields=["board", "title"], condition=models.Q(is_deleted=False), name="goals_category_active_idx"
+            ),
+            models.Index(fields=["board", "updated"], name="goals_category_updated_idx"),
+        ]
 
     title = models.CharField(verbose_name="Название", max_length=255)
     user = models.ForeignKey(User, verbose_name="Автор", on_delete=models.PROTECT)
     is_deleted = models.BooleanField(verbose_name="Удалена", default=False)
 
     board = models.ForeignKey(Board, on_delete=models.PROTECT, related_name="categories")
+    goals_count = models.PositiveIntegerField(verbose_name="Активных целей", default=0, editable=False)
+
+    counter_fields = ("goals_count",)
 
     def __str__(self):
         return self.title
 
 
+class GoalQuerySet(models.QuerySet):
+    def archive(self):
+        """Archive goals with a single UPDATE and keep GoalCategoryStat in sync. Returns the number of goals."""
+        try:
+            subquery, params = self.exclude(status=Goal.Status.archived).values('id').query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        table = connection.ops.quote_name(Goal._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH archived AS (
+                    UPDATE {table} AS goal SET status = %s, updated = %s
+                    FROM (SELECT id, status FROM {table} WHERE id IN ({subquery}) FOR UPDATE) AS old
+                    WHERE goal.id = old.id
+                    RETURNING goal.category_id, old.status, goal.priority
+                )
+                SELECT category_id, status, priority, count(*) FROM archived GROUP BY 1, 2, 3
+                """,
+                (Goal.Status.archived, timezone.now(), *params),
+            )
+            rows = cursor.fetchall()
+
+        deltas = Counter()
+        for category_id, status, priority, count in rows:
+            deltas[category_id, status, priority] -= count
+            deltas[category_id, Goal.Status.archived, priority] += count
+        GoalCategoryStat.apply_deltas(deltas)
+        return sum(row[3] for row in rows)
+
+
 class Goal(BaseModel):
     class Status(models.IntegerChoices):
         to_do = 1, "К выполнению"
@@ -72,22 +136,193 @@ class Goal(BaseModel):
     user = models.ForeignKey(User, on_delete=models.PROTECT, related_name='goals')
     status = models.PositiveSmallIntegerField(choices=Status.choices, default=Status.to_do)
     priority = models.PositiveSmallIntegerField(choices=Priority.choices, default=Priority.medium)
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
+    # Заполняется триггером goals_goal_search_vector_trigger (см. миграцию 0009)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    counter_fields = ("comments_count",)
 
     class Meta:
         verbose_name = "Цель"
         verbose_name_plural = "Цели"
+        indexes = [
+            models.Index(fields=["user", "status"], name="goals_goal_user_status_idx"),
+            models.Index(fields=["user", "title", "id"], name="goals_goal_user_title_idx"),
+            models.Index(fields=["user", "updated"], name="goals_goal_user_updated_idx"),
+            GinIndex(fields=["search_vector"], name="goals_goal_search_vector_idx"),
+        ]
+
+    objects = GoalQuerySet.as_manager()
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        # Строка блокируется в pre_save до записи статистики в post_save
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+
+    @property
+    def stat_key(self):
+        return self.category_id, self.status, self.priority
+
+
+class GoalCategoryStat(models.Model):
+    """Goal count per (category, status, priority), maintained incrementally."""
+    category = models.ForeignKey(GoalCategory, on_delete=models.CASCADE, related_name='stats')
+    status = models.PositiveSmallIntegerField(choices=Goal.Status.choices)
+    priority = models.PositiveSmallIntegerField(choices=Goal.Priority.choices)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Статистика категории"
+        verbose_name_plural = "Статистика категорий"
+        constraints = [
+            models.UniqueConstraint(fields=["category", "status", "priority"], name="goals_stat_unique_bucket"),
+        ]
+
+    @classmethod
+    def lock(cls, goals, update_fields=None):
+        """
+        Lock the rows of ``goals`` until the end of the transaction and remember their keys for ``track``.
+
+        The keys are read from the database, not from the loaded instances: a concurrent change committed
+        in between would otherwise be counted twice. Key fields missing from ``update_fields`` are not
+        written by the save, so they are refreshed too. Returns the ids of the rows found.
+        """
+        goals = {goal.pk: goal for goal in goals}
+        rows = Goal.objects.select_for_update().filter(pk__in=goals).order_by('pk')\
+            .values_list('pk', 'category_id', 'status', 'priority')
+        for goal in goals.values():
+            goal._stat_key = None
+        for pk, *key in rows:
+            goal = goals[pk]
+            goal._stat_key = tuple(key)
+            if update_fields is not None:
+                for field, value in zip(('category', 'status', 'priority'), key):
+                    if field not in update_fields:
+                        setattr(goal, goal._meta.get_field(field).attname, value)
+        return {pk for pk, goal in goals.items() if goal._stat_key is not None}
+
+    @classmethod
+    def track(cls, goals):
+        """Apply the changes of saved goals since ``lock`` (or +1 for new goals)."""
+        deltas = Counter()
+        for goal in goals:
+            old, new = getattr(goal, '_stat_key', None), goal.stat_key
+            if old != new:
+                if old is not None:
+                    deltas[old] -= 1
+                deltas[new] += 1
+                goal._stat_key = new
+        cls.apply_deltas(deltas)
+
+    @classmethod
+    def apply_deltas(cls, deltas):
+        """Apply goal count deltas to the stats table and to GoalCategory.goals_count."""
+        rows = sorted((*key, count) for key, count in deltas.items() if count)
+        if not rows:
+            return
+
+        table = connection.ops.quote_name(cls._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {table} (category_id, status, priority, count)
+                VALUES {", ".join(["(%s, %s, %s, %s)"] * len(rows))}
+                ON CONFLICT (category_id, status, priority) DO UPDATE SET count = {table}.count + EXCLUDED.count
+                """,
+                [value for row in rows for value in row],
+            )
+
+        active = Counter()
+        for category_id, status, _, count in rows:
+            if status != Goal.Status.archived:
+                active[category_id] += count
+        for category_id, count in sorted(active.items()):
+            if count:
+                GoalCategory.objects.filter(id=category_id)\
+                    .update(goals_count=models.F('goals_count') + count, updated=timezone.now())
+
+    @classmethod
+    def rebuild(cls):
+        """Recount all buckets for seeded data or manual repair; requests keep them exact through ``lock``/``track``."""
+        table = connection.ops.quote_name(cls._meta.db_table)
+        goal_table = connection.ops.quote_name(Goal._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(f"LOCK TABLE {goal_table} IN SHARE MODE")
+            cursor.execute(f"DELETE FROM {table}")
+            cursor.execute(
+                f"""
+                INSERT INTO {table} (category_id, status, priority, count)
+                SELECT category_id, status, priority, count(*) FROM {goal_table} GROUP BY 1, 2, 3
+                """
+            )
+
 
 class GoalComment(models.Model):
     class Meta:
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(fields=['user', 'created', 'id'], name='goals_comment_user_created_idx'),
+            models.Index(fields=['user', 'updated'], name='goals_comment_user_updated_idx'),
+        ]
 
     user = models.ForeignKey('core.User', on_delete=models.CASCADE)
-    created = models.DateTimeField(verbose_name='Дата создания', auto_now=True)
-    updated = models.DateTimeField(verbose_name='Дата последнего обновления', auto_now_add=True)
+    created = models.DateTimeField(verbose_name='Дата создания', auto_now_add=True)
+    updated = models.DateTimeField(verbose_name='Дата последнего обновления', auto_now=True)
     text = models.TextField()
     goal = models.ForeignKey('goals.Goal', on_delete=models.CASCADE)
+
+
+class ArchiveJob(BaseModel):
+    """Background archiving of goals of a deleted board or category, processed in chunks by run_archive_worker."""
+    class Status(models.IntegerChoices):
+        pending = 1, "В очереди"
+        running = 2, "Выполняется"
+        done = 3, "Завершено"
+        failed = 4, "Ошибка"
+
+    user = models.ForeignKey(User, on_delete=models.PROTECT, related_name="archive_jobs")
+    board = models.ForeignKey(Board, on_delete=models.PROTECT, null=True, blank=True, related_name="archive_jobs")
+    category = models.ForeignKey(
+        GoalCategory, on_delete=models.PROTECT, null=True, blank=True, related_name="archive_jobs"
+    )
+    status = models.PositiveSmallIntegerField(choices=Status.choices, default=Status.pending)
+    total = models.PositiveIntegerField(default=0)
+    archived = models.PositiveIntegerField(default=0)
+    last_goal_id = models.BigIntegerField(default=0)
+    # Неудачные попытки обработать очередную порцию подряд
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Архивация"
+        verbose_name_plural = "Архивации"
+        indexes = [
+            models.Index(fields=["id"], condition=models.Q(status__in=[1, 2]), name="goals_archivejob_pending_idx"),
+        ]
+
+    def goals(self):
+        if self.board_id:
+            return Goal.objects.filter(category__board_id=self.board_id)
+        return Goal.objects.filter(category_id=self.category_id)
+
+    def process_chunk(self, size):
+        """Archive the next ``size`` goals after ``last_goal_id``. Call inside a transaction holding the job row."""
+        ids = list(self.goals().filter(id__gt=self.last_goal_id).order_by('id').values_list('id', flat=True)[:size])
+        if ids:
+            self.archived += Goal.objects.filter(id__in=ids).archive()
+            self.last_goal_id = ids[-1]
+            self.status = self.Status.running
+        else:
+            self.status = self.Status.done
+        self.attempts = 0
+        self.save(update_fields=('archived', 'last_goal_id', 'status', 'attempts', 'updated'))
+
+    def record_failure(self, max_attempts):
+        """Count a failed chunk; the job is marked failed after ``max_attempts`` failures in a row."""
+        self.attempts += 1
+        if self.attempts >= max_attempts:
+            self.status = self.Status.failed
+        self.save(update_fields=('attempts', 'status', 'updated'))
@@ -0,0 +1,160 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+from datetime import date, datetime
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, LimitOffsetPagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over the view ordering with an ``id`` tiebreaker.
+
+    The cursor stores the ordering values of the last row, so every page is an index range scan
+    and no ``COUNT(*)`` is issued.
+    """
+    limit_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    default_limit = api_settings.PAGE_SIZE or 100
+    max_limit = 1000
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.ordering = self.get_ordering(queryset, view)
+        self.model = queryset.model
+
+        values, self.reverse = self.decode_cursor(request)
+        self.has_cursor = values is not None
+
+        ordering = [(name, not desc if self.reverse else desc) for name, desc in self.ordering]
+        if values is not None:
+            queryset = queryset.filter(self.build_filter(ordering, values))
+        queryset = queryset.order_by(*[f"-{name}" if desc else name for name, desc in ordering])
+
+        rows = list(queryset[:self.limit + 1])
+        self.has_more = len(rows) > self.limit
+        rows = rows[:self.limit]
+        if self.reverse:
+            rows.reverse()
+
+        self.first = self.get_position(rows[0]) if rows else values
+        self.last = self.get_position(rows[-1]) if rows else values
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_limit(self, request):
+        try:
+            return _positive_int(request.query_params[self.limit_query_param], strict=True, cutoff=self.max_limit)
+        except (KeyError, ValueError):
+            return self.default_limit
+
+    def get_ordering(self, queryset, view):
+        ordering = list(queryset.query.order_by) or list(getattr(view, 'ordering', None) or [])
+        result = []
+        for field in ordering:
+            if not isinstance(field, str) or '__' in field:
+                raise ValueError(f'Keyset pagination does not support ordering by {field!r}')
+            name, desc = field.lstrip('-'), field.startswith('-')
+            result.append(('id' if name == 'pk' else name, desc))
+
+        if 'id' not in [name for name, _ in result]:
+            result.append(('id', result[-1][1] if result else False))
+        return result
+
+    def get_position(self, row):
+        values = []
+        for name, _ in self.ordering:
+            value = row[name] if isinstance(row, dict) else getattr(row, name)
+            values.append(value.isoformat() if isinstance(value, (date, datetime)) else value)
+        return values
+
+    @staticmethod
+    def build_filter(ordering, values):
+        condition, equal = Q(), Q()
+        for (name, desc), value in zip(ordering, values):
+            condition |= equal & Q(**{f"{name}__{'lt' if desc else 'gt'}": value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            values, reverse = data['v'], bool(data.get('r'))
+            if len(values) != len(self.ordering):
+                raise ValueError
+            return [self.to_python(name, value) for (name, _), value in zip(self.ordering, values)], reverse
+        except (TypeError, ValueError, KeyError, binascii.Error, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def to_python(self, name, value):
+        try:
+            return self.model._meta.get_field(name).to_python(value)
+        except FieldDoesNotExist:
+            return value
+
+    def encode_cursor(self, values, reverse):
+        data = json.dumps({'v': values, 'r': reverse}, separators=(',', ':'), default=str)
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, base64.urlsafe_b64encode(data.encode()).decode())
+
+    def get_next_link(self):
+        if self.reverse or self.has_more:
+            return self.encode_cursor(self.last, False) if self.last is not None else None
+        return None
+
+    def get_previous_link(self):
+        if self.reverse and not self.has_more:
+            return None
+        if not self.has_cursor:
+            return None
+        if self.first is None:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(self.first, True)
+
+
+class OptionalCursorPagination(LimitOffsetPagination):
+    """Limit/offset pagination that switches to keyset pagination with ``?pagination=cursor`` or ``?cursor=``."""
+    mode_query_param = 'pagination'
+    cursor_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor = None
+        if request.query_params.get(self.mode_query_param) == 'cursor' \
+                or request.query_params.get(self.cursor_class.cursor_query_param):
+            self.cursor = self.cursor_class()
+            return self.cursor.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor is not None:
+            return self.cursor.get_paginated_response(data)
+        return super().get_paginated_response(data)
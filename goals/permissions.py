@@ -1,30 +1,26 @@
 from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
+
+from goals.membership import has_board_role
 from goals.models import BoardParticipant
 
 
 class BoardPermissions(IsAuthenticated):
     def has_object_permission(self, request, view, obj):
-        _filters = {'user_id': request.user.id, 'board_id': obj.id}
-        if request.method not in SAFE_METHODS:
-            _filters['role'] = BoardParticipant.Role.owner
-
-        return BoardParticipant.objects.filter(**_filters).exists()
+        roles = None if request.method in SAFE_METHODS else [BoardParticipant.Role.owner]
+        return has_board_role(request, obj.id, roles)
 
 
 class GoalCategoryPermission(IsAuthenticated):
     def has_object_permission(self, request, view, obj):
-        _filters = {'user_id': request.user.id, 'board_id': obj.board_id}
-        if request.method not in SAFE_METHODS:
-            _filters['role'] = BoardParticipant.Role.owner
-
-        return BoardParticipant.objects.filter(**_filters).exists()
+        roles = None if request.method in SAFE_METHODS else [BoardParticipant.Role.owner]
+        return has_board_role(request, obj.board_id, roles)
 
 
 class GoalPermission(IsAuthenticated):
     def has_object_permission(self, request, view, obj):
-        return request.user == obj.user
+        return request.user.id == obj.user_id
 
 
 class GoalCommentPermission(IsAuthenticated):
     def has_object_permission(self, request, view, obj):
-        return request.user == obj.user
+        return request.user.id == obj.user_id
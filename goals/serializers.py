@@ -1,10 +1,13 @@
 from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError, PermissionDenied
 
 from core.models import User
 from core.serializers import ProfileSerializer
-from goals.models import GoalCategory, Goal, GoalComment, Board, BoardParticipant
+from goals.list_cache import invalidate_list_cache
+from goals.membership import has_board_role, invalidate_board_roles
+from goals.models import GoalCategory, Goal, GoalComment, Board, BoardParticipant, ArchiveJob
 
 
 class BoardSerializer(serializers.ModelSerializer):
@@ -35,14 +38,8 @@ class BoardWithParticipantsSerializer(BoardSerializer):
     def update(self, instance, validated_data):
         request = self.context['request']
         with transaction.atomic():
-            BoardParticipant.objects.filter(board=instance).exclude(user=request.user).delete()
-            new_participants = []
-            for participant in validated_data.get('participants', []):
-                new_participants.append(
-                    BoardParticipant(user=participant['user'], role=participant['role'], board=instance)
-                )
-
-            BoardParticipant.objects.bulk_create(new_participants, ignore_conflicts=True)
+            if 'participants' in validated_data:
+                self.sync_participants(instance, validated_data['participants'], request.user)
 
             if title := validated_data.get('title'):
                 instance.title = title
@@ -50,13 +47,46 @@ class BoardWithParticipantsSerializer(BoardSerializer):
 
         return instance
 
+    @staticmethod
+    def sync_participants(board, participants, owner):
+        """Bring board members (except ``owner``) in line with ``participants`` touching only changed rows."""
+        current = {
+            participant.user_id: participant
+            for participant in BoardParticipant.objects.filter(board=board).exclude(user=owner)
+            .only('id', 'user_id', 'role')
+        }
+        submitted = {participant['user'].id: participant['role'] for participant in participants}
+
+        now = timezone.now()
+        created, changed = [], []
+        for user_id, role in submitted.items():
+            participant = current.get(user_id)
+            if participant is None:
+                created.append(BoardParticipant(board=board, user_id=user_id, role=role))
+            elif participant.role != role:
+                participant.role, participant.updated = role, now
+                changed.append(participant)
+        removed = [participant.id for user_id, participant in current.items() if user_id not in submitted]
+
+        if removed:
+            BoardParticipant.objects.filter(id__in=removed).delete()
+        BoardParticipant.objects.bulk_update(changed, ['role', 'updated'], batch_size=1000)
+        BoardParticipant.objects.bulk_create(created, ignore_conflicts=True, batch_size=1000)
+
+        user_ids = [
+            *[participant.user_id for participant in created + changed],
+            *[user_id for user_id in current if user_id not in submitted],
+        ]
+        invalidate_board_roles(*user_ids)
+        invalidate_list_cache(users=user_ids, boards=[board.id])
+
 
 class GoalCategoryCreateSerializer(serializers.ModelSerializer):
     user = serializers.HiddenField(default=serializers.CurrentUserDefault())
 
     class Meta:
         model = GoalCategory
-        read_only_fields = ("id", "created", "updated", "user", "is_deleted")
+        read_only_fields = ("id", "created", "updated", "user", "is_deleted", "goals_count")
         fields = "__all__"
 
     def validate_category(self, value):
@@ -75,17 +105,15 @@ class GoalCategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = GoalCategory
         fields = "__all__"
-        read_only_fields = ("id", "created", "updated", "user", "is_deleted")
+        read_only_fields = ("id", "created", "updated", "user", "is_deleted", "goals_count")
 
     def validate_board(self, board):
         if board.is_deleted:
             raise ValidationError("Board is deleted")
 
-        if not BoardParticipant.objects.filter(
-            board_id=board.id,
-            user_id=self.context['request'].user.id,
-            role__in=[BoardParticipant.Role.owner, BoardParticipant.Role.writer]
-        ).exists():
+        if not has_board_role(
+            self.context['request'], board.id, [BoardParticipant.Role.owner, BoardParticipant.Role.writer]
+        ):
             raise PermissionDenied
 
         return board
@@ -100,8 +128,8 @@ class GoalCreateSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Goal
-        fields = "__all__"
-        read_only_fields = ("id", "created", "updated", "user")
+        exclude = ("search_vector",)
+        read_only_fields = ("id", "created", "updated", "user", "comments_count")
 
     def validate_category(self, value):
         if value.is_deleted:
@@ -116,8 +144,8 @@ class GoalSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Goal
-        fields = "__all__"
-        read_only_fields = ("id", "created", "updated", "user")
+        exclude = ("search_vector",)
+        read_only_fields = ("id", "created", "updated", "user", "comments_count")
 
     def validate_category(self, value):
         if value.is_deleted:
@@ -131,6 +159,33 @@ class GoalWithUserSerializer(GoalSerializer):
     user = ProfileSerializer(read_only=True)
 
 
+class GoalBulkItemSerializer(serializers.Serializer):
+    action = serializers.ChoiceField(choices=("create", "update", "archive"))
+    id = serializers.IntegerField(required=False)
+    data = serializers.DictField(required=False, default=dict)
+
+    def validate(self, attrs):
+        if attrs['action'] != 'create' and 'id' not in attrs:
+            raise ValidationError({'id': 'This field is required.'})
+        return attrs
+
+
+class GoalBulkDataSerializer(serializers.ModelSerializer):
+    category = serializers.IntegerField()
+
+    class Meta:
+        model = Goal
+        fields = ("title", "description", "category", "due_date", "status", "priority")
+
+    def validate_category(self, value):
+        category = self.context['categories'].get(value)
+        if category is None or category.is_deleted:
+            raise ValidationError('Category not found')
+        if self.context['request'].user.id != category.user_id:
+            raise ValidationError(PermissionDenied.default_detail)
+        return category
+
+
 class GoalCommentCreateSerializer(serializers.ModelSerializer):
     user = serializers.HiddenField(default=serializers.CurrentUserDefault())
 
@@ -156,3 +211,10 @@ class GoalCommentSerializer(GoalCommentCreateSerializer):
 class GoalCommentWithUserSerializer(GoalCommentSerializer):
     user = ProfileSerializer(read_only=True)
     goal = serializers.PrimaryKeyRelatedField(read_only=True)
+
+
+class ArchiveJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ArchiveJob
+        exclude = ("last_goal_id",)
+        read_only_fields = ("id", "created", "updated", "user", "board", "category", "status", "total", "archived")
@@ -0,0 +1,82 @@
+from collections import Counter
+
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete, pre_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import User
+from goals.list_cache import invalidate_list_cache, invalidate_user_boards
+from goals.membership import invalidate_board_roles
+from goals.models import Board, BoardParticipant, GoalCategory, Goal, GoalCategoryStat, GoalComment
+
+PROFILE_FIELDS = {'username', 'first_name', 'last_name', 'email'}
+STAT_FIELDS = {'category', 'category_id', 'status', 'priority'}
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw, update_fields, **kwargs):
+    if created or raw or update_fields is not None and not PROFILE_FIELDS & update_fields:
+        return
+    invalidate_user_boards(instance.id)
+
+
+@receiver([post_save, post_delete], sender=Board)
+def board_changed(sender, instance, **kwargs):
+    invalidate_list_cache(boards=[instance.id])
+
+
+@receiver([post_save, post_delete], sender=BoardParticipant)
+def board_participant_changed(sender, instance, **kwargs):
+    invalidate_board_roles(instance.user_id)
+    invalidate_list_cache(users=[instance.user_id], boards=[instance.board_id])
+
+
+@receiver([post_save, post_delete], sender=GoalCategory)
+def goal_category_changed(sender, instance, **kwargs):
+    invalidate_list_cache(boards=[instance.board_id])
+
+
+@receiver(pre_save, sender=Goal)
+def goal_before_save(sender, instance, raw, update_fields, **kwargs):
+    if raw or instance._state.adding or update_fields is not None and not STAT_FIELDS & update_fields:
+        return
+    GoalCategoryStat.lock([instance], update_fields)
+
+
+@receiver(post_save, sender=Goal)
+def goal_saved(sender, instance, raw, update_fields, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and not STAT_FIELDS & update_fields:
+        invalidate_list_cache(users=[instance.user_id])
+        return
+    # goals_count категорий виден всем участникам доски
+    old_key = getattr(instance, '_stat_key', None)
+    invalidate_list_cache(users=[instance.user_id], categories=[instance.category_id, old_key and old_key[0]])
+    GoalCategoryStat.track([instance])
+
+
+@receiver(pre_delete, sender=Goal)
+def goal_before_delete(sender, instance, **kwargs):
+    GoalCategoryStat.lock([instance])
+
+
+@receiver(post_delete, sender=Goal)
+def goal_deleted(sender, instance, **kwargs):
+    invalidate_list_cache(users=[instance.user_id], categories=[instance.category_id])
+    if instance._stat_key is not None:
+        GoalCategoryStat.apply_deltas(Counter({instance._stat_key: -1}))
+
+
+@receiver(post_save, sender=GoalComment)
+def goal_comment_saved(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        Goal.objects.filter(id=instance.goal_id).update(comments_count=F('comments_count') + 1, updated=timezone.now())
+        invalidate_list_cache(users=[instance.user_id])
+
+
+@receiver(post_delete, sender=GoalComment)
+def goal_comment_deleted(sender, instance, **kwargs):
+    Goal.objects.filter(id=instance.goal_id).update(comments_count=F('comments_count') - 1, updated=timezone.now())
+    invalidate_list_cache(users=[instance.user_id])
@@ -0,0 +1,288 @@
+import threading
+from collections import Counter
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection, DatabaseError
+from django.db.models import Count
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import User
+from goals.models import Board, BoardParticipant, GoalCategory, Goal, GoalCategoryStat, GoalComment, ArchiveJob
+
+
+class GoalStatsMixin:
+    def create_fixtures(self):
+        self.user = User.objects.create(username='owner')
+        self.board = Board.objects.create(title='board')
+        BoardParticipant.objects.create(board=self.board, user=self.user)
+        self.categories = [
+            GoalCategory.objects.create(title=f'category {i}', board=self.board, user=self.user) for i in range(2)
+        ]
+
+    def create_goal(self, **kwargs):
+        return Goal.objects.create(title='goal', user=self.user, category=self.categories[0], **kwargs)
+
+    def assertStatsConsistent(self):
+        goals = Goal.objects.values_list('category_id', 'status', 'priority').annotate(count=Count('id'))
+        stats = GoalCategoryStat.objects.exclude(count=0).values_list('category_id', 'status', 'priority', 'count')
+        self.assertEqual(
+            {(category, status, priority): count for category, status, priority, count in stats},
+            {(category, status, priority): count for category, status, priority, count in goals},
+        )
+        active = Counter(
+            Goal.objects.exclude(status=Goal.Status.archived).values_list('category_id', flat=True)
+        )
+        self.assertEqual(
+            dict(GoalCategory.objects.values_list('id', 'goals_count')),
+            {category.id: active[category.id] for category in self.categories},
+        )
+
+
+class GoalCountersTest(GoalStatsMixin, TestCase):
+    def setUp(self):
+        self.create_fixtures()
+        self.client.force_login(self.user)
+
+    def request(self, method, name, data=None, *args):
+        response = getattr(self.client, method)(reverse(name, args=args), data, content_type='application/json')
+        self.assertLess(response.status_code, 300, response.content)
+        return response.json() if response.content else None
+
+    def assertCommentsConsistent(self):
+        counts = Counter(GoalComment.objects.values_list('goal_id', flat=True))
+        for goal_id, comments_count in Goal.objects.values_list('id', 'comments_count'):
+            self.assertEqual(comments_count, counts[goal_id])
+
+    def test_goal_lifecycle(self):
+        category, other = self.categories
+        goals = [
+            self.request('post', 'goals:goal-create', {'title': 'goal', 'category': category.id, **values})['id']
+            for values in ({}, {'status': Goal.Status.done}, {'priority': Goal.Priority.critical})
+        ]
+        self.assertStatsConsistent()
+
+        self.request('patch', 'goals:goal', {'status': Goal.Status.in_progress}, goals[0])
+        self.request('patch', 'goals:goal', {'category': other.id, 'priority': Goal.Priority.low}, goals[1])
+        self.request('put', 'goals:goal', {'title': 'renamed', 'category': other.id}, goals[2])
+        self.assertStatsConsistent()
+
+        results = self.request('post', 'goals:goal-bulk', [
+            {'action': 'create', 'data': {'title': 'bulk', 'category': other.id, 'status': Goal.Status.done}},
+            {'action': 'update', 'id': goals[0], 'data': {'category': other.id, 'status': Goal.Status.done}},
+            {'action': 'archive', 'id': goals[1]},
+            {'action': 'archive', 'id': goals[1]},
+        ])
+        self.assertEqual([result['status'] for result in results], ['ok', 'ok', 'ok', 'error'])
+        self.assertStatsConsistent()
+
+        self.request('delete', 'goals:goal', None, goals[2])
+        self.assertEqual(Goal.objects.get(id=goals[2]).status, Goal.Status.archived)
+        self.assertStatsConsistent()
+
+        comments = [
+            self.request('post', 'goals:comment-create', {'goal': goals[0], 'text': 'comment'})['id']
+            for _ in range(3)
+        ]
+        self.request('delete', 'goals:comment', None, comments[0])
+        self.assertCommentsConsistent()
+
+        Goal.objects.get(id=goals[0]).delete()
+        self.assertStatsConsistent()
+
+        self.request('delete', 'goals:category', None, other.id)
+        self.assertFalse(Goal.objects.filter(category=other).exclude(status=Goal.Status.archived).exists())
+        self.assertStatsConsistent()
+
+
+class ConcurrentGoalChangesTest(GoalStatsMixin, TransactionTestCase):
+    def setUp(self):
+        self.create_fixtures()
+
+    def test_stale_instances(self):
+        goal = self.create_goal()
+        first, second = Goal.objects.get(id=goal.id), Goal.objects.get(id=goal.id)
+
+        first.status = Goal.Status.done
+        first.save()
+        # Загружена до первого изменения: записывает свои значения поверх, статистика следует за строкой
+        second.category = self.categories[1]
+        second.save()
+        self.assertStatsConsistent()
+
+        first.priority = Goal.Priority.high
+        first.save(update_fields=('priority', 'updated'))
+        self.assertEqual(first.category_id, self.categories[1].id)
+        self.assertStatsConsistent()
+
+        second.status = Goal.Status.archived
+        second.save(update_fields=('status', 'updated'))
+        self.assertStatsConsistent()
+        Goal.objects.get(id=goal.id).delete()
+        self.assertStatsConsistent()
+
+    def test_concurrent_saves(self):
+        goal = self.create_goal()
+        changes = [
+            {'status': Goal.Status.in_progress}, {'status': Goal.Status.done},
+            {'category': self.categories[1]}, {'category': self.categories[0]},
+            {'priority': Goal.Priority.critical}, {'status': Goal.Status.archived},
+        ] * 3
+        barrier = threading.Barrier(len(changes))
+        errors = []
+
+        def change(values):
+            try:
+                instance = Goal.objects.get(id=goal.id)
+                barrier.wait()
+                for field, value in values.items():
+                    setattr(instance, field, value)
+                instance.save()
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=change, args=(values,)) for values in changes]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertStatsConsistent()
+
+
+class BoardSummaryTest(GoalStatsMixin, TransactionTestCase):
+    def setUp(self):
+        self.create_fixtures()
+
+    def test_summary_after_concurrent_requests(self):
+        goals = [self.create_goal() for _ in range(4)]
+        requests = []
+        for i, status in enumerate([Goal.Status.in_progress, Goal.Status.done, Goal.Status.to_do] * 2):
+            requests.append(('patch', reverse('goals:goal', args=[goals[i % 4].id]), {
+                'status': status, 'category': self.categories[i % 2].id,
+            }))
+            requests.append(('post', reverse('goals:goal-bulk'), [
+                {'action': 'update', 'id': goal.id, 'data': {'status': status, 'priority': i % 4 + 1}}
+                for goal in goals
+            ]))
+        requests.append(('delete', reverse('goals:goal', args=[goals[0].id]), None))
+        barrier = threading.Barrier(len(requests))
+        responses = []
+
+        def send(method, url, data):
+            try:
+                client = Client()
+                client.force_login(self.user)
+                barrier.wait()
+                responses.append(getattr(client, method)(url, data, content_type='application/json').status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=send, args=request) for request in requests]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(responses), len(requests))
+        self.assertTrue(all(status < 500 for status in responses), responses)
+        self.assertStatsConsistent()
+
+        summary = Client()
+        summary.force_login(self.user)
+        data = summary.get(reverse('goals:board-summary', args=[self.board.id])).json()
+        goals = Goal.objects.filter(category__board=self.board)
+        self.assertEqual(data['total'], goals.count())
+        for status, count in data['by_status'].items():
+            self.assertEqual(count, goals.filter(status=status).count())
+        for category in data['categories']:
+            self.assertEqual(category['total'], goals.filter(category=category['id']).count())
+
+
+@override_settings(GOALS_ARCHIVE_MAX_ATTEMPTS=2)
+class ArchiveWorkerTest(GoalStatsMixin, TransactionTestCase):
+    def setUp(self):
+        self.create_fixtures()
+        for _ in range(3):
+            self.create_goal()
+        self.job = ArchiveJob.objects.create(user=self.user, category=self.categories[0], total=3)
+
+    def run_worker(self):
+        call_command('run_archive_worker', once=True, chunk_size=2, stdout=StringIO(), stderr=StringIO())
+        self.job.refresh_from_db()
+
+    def test_failed_chunk(self):
+        with mock.patch.object(ArchiveJob, 'process_chunk', side_effect=DatabaseError('boom')), \
+                self.assertLogs('goals.management.commands.run_archive_worker'):
+            self.run_worker()
+            self.assertEqual((self.job.status, self.job.attempts), (ArchiveJob.Status.pending, 1))
+            self.run_worker()
+            self.assertEqual((self.job.status, self.job.attempts), (ArchiveJob.Status.failed, 2))
+        self.assertStatsConsistent()
+
+    def test_retry_after_failure(self):
+        with mock.patch.object(ArchiveJob, 'process_chunk', side_effect=DatabaseError('boom')), \
+                self.assertLogs('goals.management.commands.run_archive_worker'):
+            self.run_worker()
+        self.run_worker()
+        self.assertEqual((self.job.status, self.job.attempts), (ArchiveJob.Status.done, 0))
+        self.assertEqual(self.job.archived, 3)
+        self.assertFalse(Goal.objects.exclude(status=Goal.Status.archived).exists())
+        self.assertStatsConsistent()
+
+
+class SyncTest(GoalStatsMixin, TestCase):
+    def setUp(self):
+        self.create_fixtures()
+        self.client.force_login(self.user)
+
+    def sync(self, since=None):
+        response = self.client.get(reverse('goals:sync'), {'since': since} if since else {})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_removed_from_board(self):
+        owner = User.objects.create(username='other')
+        board = Board.objects.create(title='shared')
+        BoardParticipant.objects.create(board=board, user=owner)
+        participant = BoardParticipant.objects.create(board=board, user=self.user, role=BoardParticipant.Role.reader)
+
+        data = self.sync()
+        self.assertEqual(data['board_ids'], sorted([self.board.id, board.id]))
+        participant.delete()
+        data = self.sync(data['cursor'])
+        self.assertEqual(data['board_ids'], [self.board.id])
+        self.assertEqual(data['deleted']['boards'], [])
+
+    @override_settings(GOALS_SYNC_MAX_ITEMS=3)
+    def test_cursor_across_pages(self):
+        goals = [self.create_goal() for _ in range(7)]
+        now = timezone.now()
+        # Несколько целей с одним updated на границе страницы (как после массового обновления)
+        for goal, minutes in zip(goals, (50, 40, 30, 30, 30, 30, 20)):
+            Goal.objects.filter(id=goal.id).update(updated=now - timedelta(minutes=minutes))
+        Goal.objects.filter(id=goals[-1].id).update(status=Goal.Status.archived, updated=now - timedelta(minutes=20))
+
+        data = self.sync()
+        seen, deleted, pages = set(), set(), 1
+        while True:
+            seen.update(goal['id'] for goal in data['goals'])
+            deleted.update(data['deleted']['goals'])
+            if not data['has_more']:
+                break
+            data = self.sync(data['cursor'])
+            pages += 1
+        self.assertGreater(pages, 1)
+        self.assertEqual(seen, {goal.id for goal in goals[:-1]})
+        self.assertEqual(deleted, {goals[-1].id})
+
+        new = self.create_goal()
+        data = self.sync(data['cursor'])
+        self.assertIn(new.id, [goal['id'] for goal in data['goals']])
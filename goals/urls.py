@@ -1,22 +1,39 @@
+from django.conf import settings
 from django.urls import path
 
-from goals import views
+from goals import views, async_views
+
+
+# Под ASGI (gunicorn с uvicorn-воркерами) списки обслуживают асинхронные варианты
+if settings.ASYNC_LIST_VIEWS:
+    board_list = async_views.AsyncBoardListView.as_view()
+    category_list = async_views.AsyncGoalCategoryListView.as_view()
+    goal_list = async_views.AsyncGoalListView.as_view()
+else:
+    board_list = views.BoardListView.as_view()
+    category_list = views.GoalCategoryListView.as_view()
+    goal_list = views.GoalListView.as_view()
 
 
 urlpatterns = [
     path("board/create", views.BoardCreateView.as_view(), name='board-create'),
-    path("board/list", views.BoardListView.as_view(), name='board-list'),
+    path("board/list", board_list, name='board-list'),
     path("board/<int:pk>", views.BoardDetailView.as_view(), name='board'),
+    path("board/<int:pk>/summary", views.BoardSummaryView.as_view(), name='board-summary'),
+    path("archive_job/<int:pk>", views.ArchiveJobView.as_view(), name='archive-job'),
 
     path("goal_category/create", views.GoalCategoryCreateView.as_view(), name='category-create'),
-    path("goal_category/list", views.GoalCategoryListView.as_view(), name='category-list'),
+    path("goal_category/list", category_list, name='category-list'),
     path("goal_category/<int:pk>", views.GoalCategoryDetailView.as_view(), name='category'),
 
     path("goal/create", views.GoalCreateView.as_view(), name='goal-create'),
-    path("goal/list", views.GoalListView.as_view(), name='goal-list'),
+    path("goal/list", goal_list, name='goal-list'),
+    path("goal/bulk", views.GoalBulkView.as_view(), name='goal-bulk'),
     path("goal/<int:pk>", views.GoalDetailView.as_view(), name='goal'),
 
     path('goal_comment/create', views.GoalCommentCreateView.as_view(), name='comment-create'),
     path('goal_comment/list', views.GoalCommentListView.as_view(), name='comment-list'),
     path('goal_comment/<int:pk>', views.GoalCommentDetailView.as_view(), name='comment'),
+
+    path('sync', views.SyncView.as_view(), name='sync'),
 ]
@@ -0,0 +1,95 @@
+from functools import lru_cache
+
+from rest_framework import fields, relations, serializers
+
+
+IDENTITY_FIELDS = (
+    fields.IntegerField, fields.CharField, fields.BooleanField, fields.ChoiceField, fields.ReadOnlyField,
+    relations.PrimaryKeyRelatedField, relations.SlugRelatedField,
+)
+
+
+class ValuesSerializer:
+    """
+    Read-only counterpart of a DRF serializer that works on ``QuerySet.values()`` rows.
+
+    Field mappers are compiled once from the serializer declaration, so the output matches
+    ``serializer_class(many=True).data`` key for key without building model instances.
+    """
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self.paths = []
+        self.mappers = self.compile(serializer_class(), prefix='')
+
+    def compile(self, serializer, prefix):
+        mappers = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+
+            source = prefix + field.source.replace('.', '__')
+            if isinstance(field, serializers.BaseSerializer):
+                if isinstance(field, serializers.ListSerializer):
+                    raise TypeError(f'{serializer.__class__.__name__}.{name}: nested lists are not supported')
+                self.add_path(source)
+                mappers.append((name, self.nested_mapper(source, self.compile(field, prefix=source + '__'))))
+                continue
+
+            if isinstance(field, relations.SlugRelatedField):
+                source = f'{source}__{field.slug_field}'
+            elif isinstance(field, (relations.RelatedField, relations.ManyRelatedField)) \
+                    and not isinstance(field, relations.PrimaryKeyRelatedField):
+                raise TypeError(f'{serializer.__class__.__name__}.{name}: {type(field).__name__} is not supported')
+            elif field.source == '*' or not isinstance(field, fields.Field) \
+                    or isinstance(field, fields.SerializerMethodField):
+                raise TypeError(f'{serializer.__class__.__name__}.{name}: {type(field).__name__} is not supported')
+
+            self.add_path(source)
+            if isinstance(field, IDENTITY_FIELDS):
+                mappers.append((name, self.identity_mapper(source)))
+            else:
+                mappers.append((name, self.field_mapper(source, field.to_representation)))
+        return mappers
+
+    def add_path(self, path):
+        if path not in self.paths:
+            self.paths.append(path)
+
+    @staticmethod
+    def identity_mapper(source):
+        def mapper(row):
+            return row[source]
+        return mapper
+
+    @staticmethod
+    def field_mapper(source, to_representation):
+        def mapper(row):
+            value = row[source]
+            return None if value is None else to_representation(value)
+        return mapper
+
+    @staticmethod
+    def nested_mapper(source, mappers):
+        def mapper(row):
+            if row[source] is None:
+                return None
+            return {name: field_mapper(row) for name, field_mapper in mappers}
+        return mapper
+
+    def project(self, queryset):
+        """Return ``queryset.values()`` with every column needed for output and for the current ordering."""
+        paths = list(self.paths)
+        for field in queryset.query.order_by:
+            if isinstance(field, str) and field.lstrip('-') not in paths:
+                paths.append(field.lstrip('-'))
+        return queryset.values(*paths)
+
+    def to_representation(self, rows):
+        mappers = self.mappers
+        return [{name: mapper(row) for name, mapper in mappers} for row in rows]
+
+
+@lru_cache(maxsize=None)
+def get_values_serializer(serializer_class):
+    return ValuesSerializer(serializer_class)
@@ -1,15 +1,40 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.db import transaction
+from django.db.models import Q, Sum, Prefetch
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.generics import CreateAPIView, ListAPIView, RetrieveUpdateDestroyAPIView
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import CreateAPIView, ListAPIView, RetrieveUpdateDestroyAPIView, GenericAPIView, \
+    RetrieveAPIView
 from rest_framework import permissions, filters
 from rest_framework.pagination import LimitOffsetPagination
-
-from goals.filters import GoalDateFilter
-from goals.models import GoalCategory, Goal, GoalComment, BoardParticipant, Board
+from rest_framework.response import Response
+
+from goals.filters import GoalDateFilter, GoalSearchFilter
+from goals.list_cache import invalidate_list_cache
+from goals.membership import get_board_roles
+from goals.mixins import ValuesListMixin, ConditionalGetMixin, ArchiveDestroyMixin, CachedListMixin
+from goals.models import GoalCategory, Goal, GoalComment, BoardParticipant, Board, GoalCategoryStat, ArchiveJob
+from goals.pagination import OptionalCursorPagination
 from goals.permissions import BoardPermissions, GoalCategoryPermission, GoalPermission, GoalCommentPermission
 from goals.serializers import GoalCategoryCreateSerializer, GoalCreateSerializer, GoalCommentCreateSerializer,\
     BoardSerializer, BoardWithParticipantsSerializer, GoalCategoryWithUserSerializer, GoalWithUserSerializer, \
-    GoalCommentWithUserSerializer
+    GoalCommentWithUserSerializer, GoalBulkItemSerializer, GoalBulkDataSerializer, GoalSerializer, ArchiveJobSerializer
+from goals.values_serializers import get_values_serializer
+from todolist.middleware import timed
+
+
+def archive_goals(user, active, **target):
+    """Archive goals of a deleted board or category now, or schedule an ArchiveJob when there are many of them."""
+    job = ArchiveJob(user=user, total=active, **target)
+    if active <= settings.GOALS_ARCHIVE_BACKGROUND_THRESHOLD:
+        job.goals().archive()
+        return None
+    job.save()
+    return job
 
 
 class BoardCreateView(CreateAPIView):
@@ -20,7 +45,7 @@ class BoardCreateView(CreateAPIView):
         BoardParticipant.objects.create(user=self.request.user, board=serializer.save())
 
 
-class BoardListView(ListAPIView):
+class BoardListView(CachedListMixin, ConditionalGetMixin, ValuesListMixin, ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = BoardSerializer
 
@@ -30,19 +55,79 @@ class BoardListView(ListAPIView):
     def get_queryset(self):
         return Board.objects.filter(participants__user_id=self.request.user.id).exclude(is_deleted=True)
 
+    def get_etag_querysets(self):
+        return [Board.objects.filter(participants__user_id=self.request.user.id)]
 
-class BoardDetailView(RetrieveUpdateDestroyAPIView):
+
+class BoardDetailView(ConditionalGetMixin, ArchiveDestroyMixin, RetrieveUpdateDestroyAPIView):
     permission_classes = [BoardPermissions]
     serializer_class = BoardWithParticipantsSerializer
 
     def get_queryset(self):
-        return Board.objects.filter(participants__user_id=self.request.user.id).exclude(is_deleted=True)
+        return Board.objects.filter(id__in=list(get_board_roles(self.request))).exclude(is_deleted=True)\
+            .prefetch_related(Prefetch('participants', queryset=BoardParticipant.objects.select_related('user')))
+
+    def get_etag_querysets(self):
+        board_id = self.kwargs['pk']
+        if board_id not in get_board_roles(self.request):
+            return []
+        return [Board.objects.filter(id=board_id), BoardParticipant.objects.filter(board_id=board_id)]
 
     def perform_destroy(self, instance):
+        now = timezone.now()
         with transaction.atomic():
-            Board.objects.filter(id=instance.id).update(is_deleted=True)
-            instance.categories.update(is_deleted=True)
-            Goal.objects.filter(category__board=instance).update(status=Goal.Status.archived)
+            Board.objects.filter(id=instance.id).update(is_deleted=True, updated=now)
+            instance.categories.update(is_deleted=True, updated=now)
+            invalidate_list_cache(boards=[instance.id])
+            active = instance.categories.aggregate(count=Sum('goals_count'))['count'] or 0
+            return archive_goals(self.request.user, active, board=instance)
+
+
+class BoardSummaryView(RetrieveAPIView):
+    permission_classes = [BoardPermissions]
+
+    def get_queryset(self):
+        return Board.objects.filter(id__in=list(get_board_roles(self.request))).exclude(is_deleted=True)
+
+    def retrieve(self, request, *args, **kwargs):
+        board = self.get_object()
+        stats = list(
+            GoalCategoryStat.objects.filter(category__board=board, category__is_deleted=False, count__gt=0)
+            .values_list('category_id', 'category__title', 'status', 'priority', 'count')
+        )
+
+        summary = self.empty_summary(id=board.id, title=board.title)
+        categories = {
+            category.id: self.empty_summary(id=category.id, title=category.title)
+            for category in board.categories.filter(is_deleted=False).only('id', 'title')
+        }
+        for category_id, title, status, priority, count in stats:
+            # Категория, удалённая между запросами, всё равно попадает в статистику: не падаем на ней
+            category = categories.setdefault(category_id, self.empty_summary(id=category_id, title=title))
+            for item in (summary, category):
+                item['total'] += count
+                item['by_status'][status] += count
+                item['by_priority'][priority] += count
+
+        summary['categories'] = sorted(categories.values(), key=lambda item: item['title'])
+        return Response(summary)
+
+    @staticmethod
+    def empty_summary(**kwargs):
+        return {
+            **kwargs,
+            'total': 0,
+            'by_status': dict.fromkeys(Goal.Status.values, 0),
+            'by_priority': dict.fromkeys(Goal.Priority.values, 0),
+        }
+
+
+class ArchiveJobView(RetrieveAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = ArchiveJobSerializer
+
+    def get_queryset(self):
+        return ArchiveJob.objects.filter(user=self.request.user)
 
 
 class GoalCategoryCreateView(CreateAPIView):
@@ -51,7 +136,7 @@ class GoalCategoryCreateView(CreateAPIView):
     serializer_class = GoalCategoryCreateSerializer
 
 
-class GoalCategoryListView(ListAPIView):
+class GoalCategoryListView(CachedListMixin, ValuesListMixin, ListAPIView):
     model = GoalCategory
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = GoalCategoryWithUserSerializer
@@ -63,10 +148,11 @@ class GoalCategoryListView(ListAPIView):
     search_fields = ["title"]
 
     def get_queryset(self):
-        return GoalCategory.objects.filter(board__participants__user=self.request.user).exclude(is_deleted=True)
+        return GoalCategory.objects.select_related('user').filter(board__participants__user=self.request.user)\
+            .exclude(is_deleted=True)
 
 
-class GoalCategoryDetailView(RetrieveUpdateDestroyAPIView):
+class GoalCategoryDetailView(ArchiveDestroyMixin, RetrieveUpdateDestroyAPIView):
     model = GoalCategory
     permission_classes = [GoalCategoryPermission]
     serializer_class = GoalCategoryWithUserSerializer
@@ -77,8 +163,8 @@ class GoalCategoryDetailView(RetrieveUpdateDestroyAPIView):
     def perform_destroy(self, instance):
         with transaction.atomic():
             instance.is_deleted = True
-            instance.save(update_fields=('is_deleted',))
-            instance.goals.update(status=Goal.Status.archived)
+            instance.save(update_fields=('is_deleted', 'updated'))
+            return archive_goals(self.request.user, instance.goals_count, category=instance)
 
 
 class GoalCreateView(CreateAPIView):
@@ -86,11 +172,108 @@ class GoalCreateView(CreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
 
-class GoalListView(ListAPIView):
+class GoalBulkView(GenericAPIView):
+    """
+    Create, partially update and archive goals in one request.
+
+    Body: ``[{"action": "create", "data": {...}}, {"action": "update", "id": 1, "data": {...}},
+    {"action": "archive", "id": 2}]``. Invalid items are reported and skipped, valid ones are
+    written with ``bulk_create``/``bulk_update`` in a single transaction.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = GoalBulkItemSerializer
+
+    def post(self, request, *args, **kwargs):
+        if not isinstance(request.data, list):
+            raise ValidationError('Expected a list of items')
+        if len(request.data) > settings.GOALS_BULK_MAX_ITEMS:
+            raise ValidationError(f'Ensure there are no more than {settings.GOALS_BULK_MAX_ITEMS} items')
+
+        items, results = [], []
+        for index, data in enumerate(request.data):
+            serializer = self.get_serializer(data=data)
+            if serializer.is_valid():
+                items.append((index, serializer.validated_data))
+                results.append({'index': index, 'action': serializer.validated_data['action']})
+            else:
+                results.append({'index': index, 'status': 'error', 'errors': serializer.errors})
+
+        context = self.get_serializer_context()
+        context['categories'] = GoalCategory.objects.in_bulk(self.get_category_ids(items))
+        goals = Goal.objects.select_related('user').filter(category__is_deleted=False, user=request.user)\
+            .exclude(status=Goal.Status.archived)\
+            .in_bulk([item['id'] for _, item in items if item['action'] != 'create'])
+
+        created, changed, changed_fields = [], {}, {'updated'}
+        for index, item in items:
+            if item['action'] == 'create':
+                serializer = GoalBulkDataSerializer(data=item['data'], context=context)
+            elif item['id'] not in goals:
+                results[index].update(status='error', errors={'id': ['Not found.']})
+                continue
+            elif item['action'] == 'update':
+                serializer = GoalBulkDataSerializer(goals[item['id']], data=item['data'], partial=True, context=context)
+            else:
+                goal = goals.pop(item['id'])
+                goal.status = Goal.Status.archived
+                changed[goal.id] = goal
+                changed_fields.add('status')
+                results[index].update(status='ok', id=goal.id)
+                continue
+
+            if not serializer.is_valid():
+                results[index].update(status='error', errors=serializer.errors)
+            elif item['action'] == 'create':
+                goal = Goal(user=request.user, **serializer.validated_data)
+                created.append((index, goal))
+            else:
+                goal = goals[item['id']]
+                for field, value in serializer.validated_data.items():
+                    setattr(goal, field, value)
+                changed[goal.id] = goal
+                changed_fields.update(serializer.validated_data)
+                results[index]['goal'] = goal
+
+        with transaction.atomic():
+            Goal.objects.bulk_create([goal for _, goal in created])
+            if changed:
+                locked = GoalCategoryStat.lock(changed.values(), changed_fields)
+                changed = {goal_id: goal for goal_id, goal in changed.items() if goal_id in locked}
+            now = timezone.now()
+            for goal in changed.values():
+                goal.updated = now
+            Goal.objects.bulk_update(changed.values(), changed_fields)
+            categories = {goal.category_id for goal in [*[goal for _, goal in created], *changed.values()]}
+            categories.update(goal._stat_key[0] for goal in changed.values())
+            invalidate_list_cache(users=[request.user.id], categories=categories)
+            GoalCategoryStat.track([goal for _, goal in created] + list(changed.values()))
+
+        for index, goal in created:
+            results[index]['goal'] = goal
+        for result in results:
+            if 'goal' in result:
+                goal = result.pop('goal')
+                result.update(status='ok', id=goal.id, data=GoalSerializer(goal).data)
+
+        return Response(results)
+
+    @staticmethod
+    def get_category_ids(items):
+        ids = set()
+        for _, item in items:
+            try:
+                ids.add(int(item['data']['category']))
+            except (KeyError, TypeError, ValueError):
+                pass
+        return ids
+
+
+class GoalListView(CachedListMixin, ConditionalGetMixin, ValuesListMixin, ListAPIView):
     serializer_class = GoalWithUserSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = OptionalCursorPagination
 
-    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, filters.SearchFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, GoalSearchFilter]
     filterset_class = GoalDateFilter
     ordering_fields = ["title", "created"]
     ordering = ["title"]
@@ -100,6 +283,11 @@ class GoalListView(ListAPIView):
         return Goal.objects.select_related('user').filter(user=self.request.user, category__is_deleted=False)\
             .exclude(status=Goal.Status.archived)
 
+    def get_etag_querysets(self):
+        goals = Goal.objects.filter(user=self.request.user)
+        # Удаление категории или доски сразу скрывает цели, а архивирует их позже фоновая задача
+        return [goals, GoalCategory.objects.filter(id__in=goals.values('category_id'))]
+
 
 class GoalDetailView(RetrieveUpdateDestroyAPIView):
     permission_classes = [GoalPermission]
@@ -110,7 +298,7 @@ class GoalDetailView(RetrieveUpdateDestroyAPIView):
 
     def perform_destroy(self, instance):
         instance.status = Goal.Status.archived
-        instance.save(update_fields=('status',))
+        instance.save(update_fields=('status', 'updated'))
 
 
 class GoalCommentCreateView(CreateAPIView):
@@ -118,9 +306,10 @@ class GoalCommentCreateView(CreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
 
-class GoalCommentListView(ListAPIView):
+class GoalCommentListView(ValuesListMixin, ListAPIView):
     serializer_class = GoalCommentWithUserSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = OptionalCursorPagination
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['goal']
     ordering = ['-created']
@@ -133,3 +322,95 @@ class GoalCommentDetailView(RetrieveUpdateDestroyAPIView):
     permission_classes = [GoalCommentPermission]
     serializer_class = GoalCommentWithUserSerializer
     queryset = GoalComment.objects.select_related('user')
+
+
+class SyncView(GenericAPIView):
+    """
+    Objects changed since ``?since=<cursor>`` (everything when omitted) plus ids of soft-deleted
+    boards and categories and of archived goals.
+
+    Continue with the returned ``cursor``; while ``has_more`` is true more changes are pending.
+    Objects may be repeated between pages and should be upserted by id.
+
+    Leaving a board leaves no deleted row to report, so every response also carries ``board_ids``,
+    all boards the user has access to now: local boards missing from it (with their categories)
+    should be dropped.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        since = self.get_since(request)
+        now = timezone.now()
+        user = request.user
+        board_ids = list(get_board_roles(request))
+
+        changed = board_changed = category_changed = Q()
+        if since is not None:
+            # Доски, в которые пользователя добавили, передаются целиком вместе с категориями
+            joined_board_ids = BoardParticipant.objects.filter(user=user, updated__gt=since)\
+                .values_list('board_id', flat=True)
+            changed = Q(updated__gt=since)
+            board_changed = changed | Q(id__in=joined_board_ids)
+            category_changed = changed | Q(board_id__in=joined_board_ids)
+
+        sections = {
+            'boards': (
+                Board.objects.filter(board_changed, id__in=board_ids),
+                BoardSerializer, ('is_deleted',), lambda row: row['is_deleted'],
+            ),
+            'categories': (
+                GoalCategory.objects.filter(category_changed, board_id__in=board_ids),
+                GoalCategoryWithUserSerializer, ('is_deleted',), lambda row: row['is_deleted'],
+            ),
+            'goals': (
+                Goal.objects.filter(changed, user=user), GoalWithUserSerializer, ('category__is_deleted',),
+                lambda row: row['status'] == Goal.Status.archived or row['category__is_deleted'],
+            ),
+            'comments': (
+                GoalComment.objects.filter(changed, user=user), GoalCommentWithUserSerializer, (), lambda row: False,
+            ),
+        }
+
+        limit = settings.GOALS_SYNC_MAX_ITEMS
+        data, deleted, cursors = {'cursor': None, 'has_more': False}, {}, []
+        for name, (queryset, serializer_class, extra, is_deleted) in sections.items():
+            values_serializer = get_values_serializer(serializer_class)
+            queryset = queryset.values(*dict.fromkeys([*values_serializer.paths, *extra])).order_by('updated', 'id')
+
+            rows = list(queryset[:limit + 1])
+            if len(rows) > limit:
+                # Строки с одинаковым updated (массовые операции) отдаём целиком, иначе курсор не сдвинется
+                rows = rows[:limit]
+                last = rows[-1]
+                rows += queryset.filter(updated=last['updated'], id__gt=last['id'])
+                cursors.append(last['updated'])
+
+            with timed('serialize'):
+                data[name] = values_serializer.to_representation([row for row in rows if not is_deleted(row)])
+            if name != 'comments':
+                deleted[name] = [row['id'] for row in rows if is_deleted(row)]
+        data['deleted'] = deleted
+        data['board_ids'] = sorted(board_ids)
+
+        if cursors:
+            data['has_more'] = True
+            cursor = min(cursors)
+        else:
+            cursor = now - timedelta(seconds=settings.GOALS_SYNC_OVERLAP_SECONDS)
+            if since is not None:
+                cursor = max(cursor, since)
+        data['cursor'] = cursor.isoformat()
+        return Response(data)
+
+    @staticmethod
+    def get_since(request):
+        since = request.query_params.get('since')
+        if not since:
+            return None
+        try:
+            value = parse_datetime(since)
+        except ValueError:
+            value = None
+        if value is None or timezone.is_naive(value):
+            raise ValidationError({'since': 'Invalid cursor'})
+        return value
@@ -0,0 +1,27 @@
+# Production server: gunicorn managing uvicorn workers that run todolist.asgi:application.
+# Every worker runs an event loop, so slow clients and the async list views do not block it.
+import multiprocessing
+import os
+import shutil
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+worker_class = "uvicorn.workers.UvicornWorker"
+# Each worker holds up to ASYNC_DB_THREADS + 1 database connections (async view threads and the thread
+# of sync views): keep workers * (ASYNC_DB_THREADS + 1) below max_connections of Postgres, or set
+# DB_POOL_SIZE to cap the connections of a worker
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = 30
+keepalive = 5
+# Recycle workers periodically to bound memory growth
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 10000))
+max_requests_jitter = max_requests // 10
+accesslog = "-"
+
+# Workers share their metrics through this directory, so /metrics of any worker shows the whole server
+os.environ.setdefault("METRICS_DIR", "/tmp/todolist-metrics")
+
+
+def on_starting(server):
+    # Counters start from zero with every server start
+    shutil.rmtree(os.environ["METRICS_DIR"], ignore_errors=True)
@@ -0,0 +1,58 @@
+"""
+Compare two result files of ``loadtest.run``.
+
+    python -m loadtest.compare baseline.json candidate.json [--threshold 10]
+
+Prints per-endpoint throughput and p50/p95/p99 changes; exits with 1 when a percentile of any
+endpoint got worse by more than ``--threshold`` percent or new errors appeared.
+"""
+import argparse
+import json
+
+METRICS = ("rps", "p50_ms", "p95_ms", "p99_ms")
+
+
+def change(old, new):
+    if not old or new is None:
+        return None
+    return (new - old) / old * 100
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10, help="allowed latency regression, percent")
+    options = parser.parse_args(argv)
+
+    with open(options.baseline) as file:
+        baseline = json.load(file)
+    with open(options.candidate) as file:
+        candidate = json.load(file)
+
+    regressions = []
+    print(f"{'endpoint':<22}" + "".join(f"{metric:>22}" for metric in METRICS) + f"{'errors':>12}")
+    rows = {**candidate["endpoints"], "total": candidate["total"]}
+    for name, new in rows.items():
+        old = baseline["endpoints"].get(name) if name != "total" else baseline["total"]
+        if old is None:
+            print(f"{name:<22} (new endpoint)")
+            continue
+
+        cells = []
+        for metric in METRICS:
+            delta = change(old[metric], new[metric])
+            cells.append(f"{old[metric]} -> {new[metric]}" + (f" {delta:+.0f}%" if delta is not None else ""))
+            if metric != "rps" and delta is not None and delta > options.threshold:
+                regressions.append(f"{name} {metric} {delta:+.0f}%")
+        if new["errors"] > old["errors"]:
+            regressions.append(f"{name} errors {old['errors']} -> {new['errors']}")
+        print(f"{name:<22}" + "".join(f"{cell:>22}" for cell in cells) + f"{old['errors']:>6} -> {new['errors']}")
+
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,197 @@
+"""
+Closed-model load test of a running API server.
+
+    python -m loadtest.run --host http://localhost:8000 --users 20 --duration 60 --output results.json
+
+Every virtual user is a thread with its own session that runs the traffic mix of
+``loadtest.workload``. Throughput, latency percentiles and errors per endpoint are printed and
+written as JSON; compare two runs with ``python -m loadtest.compare old.json new.json``.
+"""
+import argparse
+import json
+import math
+import platform
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+import requests
+
+from loadtest.workload import ACTIONS, VirtualUser
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+        self.setup_failures = []
+        self.recording = False
+
+    def add(self, name, elapsed, error=None):
+        if not self.recording or name == "setup":
+            return
+        with self.lock:
+            self.latencies.setdefault(name, []).append(elapsed)
+            if error is not None:
+                errors = self.errors.setdefault(name, {})
+                errors[error] = errors.get(error, 0) + 1
+
+    def summary(self, duration):
+        endpoints = {}
+        for name in sorted(self.latencies):
+            latencies = sorted(self.latencies[name])
+            errors = self.errors.get(name, {})
+            endpoints[name] = {
+                "requests": len(latencies),
+                "errors": sum(errors.values()),
+                "error_kinds": errors,
+                "rps": round(len(latencies) / duration, 2),
+                "p50_ms": percentile(latencies, 50),
+                "p95_ms": percentile(latencies, 95),
+                "p99_ms": percentile(latencies, 99),
+                "max_ms": round(latencies[-1], 2),
+            }
+        everything = sorted(value for values in self.latencies.values() for value in values)
+        total = {
+            "requests": len(everything),
+            "errors": sum(sum(errors.values()) for errors in self.errors.values()),
+            "rps": round(len(everything) / duration, 2),
+            "p50_ms": percentile(everything, 50),
+            "p95_ms": percentile(everything, 95),
+            "p99_ms": percentile(everything, 99),
+        }
+        return endpoints, total
+
+
+def percentile(values, rank):
+    """Nearest-rank percentile of sorted ``values``."""
+    if not values:
+        return None
+    return round(values[max(0, math.ceil(rank / 100 * len(values)) - 1)], 2)
+
+
+class Client:
+    """``requests.Session`` with the CSRF header DRF session authentication expects on writes."""
+
+    def __init__(self, host, stats, timeout):
+        self.host = host.rstrip("/")
+        self.stats = stats
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def request(self, name, method, path, **kwargs):
+        headers = {}
+        if method != "GET" and "csrftoken" in self.session.cookies:
+            headers["X-CSRFToken"] = self.session.cookies["csrftoken"]
+
+        started = time.perf_counter()
+        try:
+            response = self.session.request(
+                method, self.host + path, headers=headers, timeout=self.timeout, **kwargs
+            )
+        except requests.RequestException as e:
+            self.stats.add(name, (time.perf_counter() - started) * 1000, type(e).__name__)
+            if name == "setup":
+                raise
+            return None
+
+        elapsed = (time.perf_counter() - started) * 1000
+        error = None if response.status_code < 400 else f"HTTP {response.status_code}"
+        self.stats.add(name, elapsed, error)
+        if error is not None:
+            if name == "setup":
+                raise RuntimeError(f"{method} {path}: {response.status_code} {response.text[:200]}")
+            return None
+        return response.json() if response.content else {}
+
+
+def run_user(n, options, stats, run_id, prepared, start, deadline):
+    user = VirtualUser(Client(options.host, stats, options.timeout), n, options.seed, run_id)
+    try:
+        user.setup()
+    except Exception as e:
+        stats.setup_failures.append(f"user {n}: {e}")
+        return
+    finally:
+        prepared.release()
+
+    start.wait()
+    think = random.Random(options.seed * 1000 + n)
+    while time.monotonic() < deadline[0]:
+        user.step()
+        if options.think_time:
+            time.sleep(think.expovariate(1 / options.think_time))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="http://localhost:8000")
+    parser.add_argument("--users", type=int, default=20, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=60, help="measured seconds after setup")
+    parser.add_argument("--think-time", type=float, default=0.5, help="mean pause between actions, seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--output", help="JSON file for the results")
+    options = parser.parse_args(argv)
+
+    stats = Stats()
+    run_id = uuid.uuid4().hex[:8]
+    prepared, start, deadline = threading.Semaphore(0), threading.Event(), [math.inf]
+    threads = [
+        threading.Thread(target=run_user, args=(n, options, stats, run_id, prepared, start, deadline), daemon=True)
+        for n in range(options.users)
+    ]
+    print(f"setting up {options.users} users on {options.host}...")
+    for thread in threads:
+        thread.start()
+    for _ in threads:
+        prepared.acquire()
+    for failure in stats.setup_failures:
+        print(f"setup failed: {failure}")
+
+    stats.recording = True
+    deadline[0] = time.monotonic() + options.duration
+    measured_from = time.monotonic()
+    start.set()
+    for thread in threads:
+        thread.join()
+    duration = time.monotonic() - measured_from
+
+    endpoints, total = stats.summary(duration)
+    print_report(endpoints, total)
+
+    if options.output:
+        result = {
+            "started": datetime.now(timezone.utc).isoformat(),
+            "host": options.host,
+            "python": platform.python_version(),
+            "options": {
+                "users": options.users, "duration": options.duration,
+                "think_time": options.think_time, "seed": options.seed,
+            },
+            "mix": {name: weight for name, _, weight in ACTIONS},
+            "duration": round(duration, 2),
+            "setup_failures": len(stats.setup_failures),
+            "total": total,
+            "endpoints": endpoints,
+        }
+        with open(options.output, "w") as file:
+            json.dump(result, file, indent=2, ensure_ascii=False)
+        print(f"results written to {options.output}")
+    return 1 if total["errors"] or stats.setup_failures else 0
+
+
+def print_report(endpoints, total):
+    print(f"{'endpoint':<22} {'reqs':>7} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}  ms")
+    for name, row in [*endpoints.items(), ("total", total)]:
+        print(
+            f"{name:<22} {row['requests']:>7} {row['errors']:>5} {row['rps']:>8} "
+            f"{row['p50_ms'] or 0:>8} {row['p95_ms'] or 0:>8} {row['p99_ms'] or 0:>8}"
+        )
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,126 @@
+"""
+Traffic model of the load test.
+
+Each virtual user signs up, builds a small board (categories, goals, a comment) and then picks
+actions from ``ACTIONS`` with the given weights. Action choice, ids and payloads come from a
+per-user ``random.Random(seed + n)``, so a run with the same seed sends the same requests.
+"""
+import random
+
+STATUSES = (1, 2, 3)
+PRIORITIES = (1, 2, 3, 4)
+WORDS = ("план", "отчёт", "встреча", "спорт", "книга", "ремонт", "релиз", "тест", "идея", "покупки")
+
+
+class VirtualUser:
+    def __init__(self, client, n, seed, run_id):
+        self.client = client
+        self.rnd = random.Random(seed + n)
+        self.username = f"load_{run_id}_{n}"
+        self.password = f"Load-{run_id}-pass"
+        self.boards, self.categories, self.goals = [], [], []
+
+    def setup(self, categories=3, goals=20):
+        """Unmeasured preparation: account, own board, categories and goals."""
+        self.client.request("setup", "POST", "/core/signup", json={
+            "username": self.username, "password": self.password, "password_repeat": self.password,
+        })
+        self.login(name="setup")
+        board = self.client.request("setup", "POST", "/goals/board/create", json={"title": f"{self.username} board"})
+        self.boards.append(board["id"])
+        for _ in range(categories):
+            category = self.client.request("setup", "POST", "/goals/goal_category/create", json={
+                "title": self.words(2), "board": board["id"],
+            })
+            self.categories.append(category["id"])
+        for _ in range(goals):
+            self.create_goal(name="setup")
+        self.client.request("setup", "POST", "/goals/goal_comment/create", json={
+            "text": self.words(5), "goal": self.goals[0],
+        })
+
+    def words(self, count):
+        return " ".join(self.rnd.choice(WORDS) for _ in range(count))
+
+    def step(self):
+        name, action = self.rnd.choices(ACTIONS, weights=WEIGHTS)[0][:2]
+        action(self, name)
+
+    def login(self, name="core/login"):
+        self.client.request(name, "POST", "/core/login", json={"username": self.username, "password": self.password})
+
+    def board_list(self, name):
+        self.client.request(name, "GET", "/goals/board/list")
+
+    def board_detail(self, name):
+        self.client.request(name, "GET", f"/goals/board/{self.rnd.choice(self.boards)}")
+
+    def board_summary(self, name):
+        self.client.request(name, "GET", f"/goals/board/{self.rnd.choice(self.boards)}/summary")
+
+    def category_list(self, name):
+        self.client.request(name, "GET", "/goals/goal_category/list", params={
+            "board": self.rnd.choice(self.boards), "limit": 20,
+        })
+
+    def goal_list(self, name):
+        self.client.request(name, "GET", "/goals/goal/list", params={"limit": 20, "ordering": "-created"})
+
+    def goal_list_filtered(self, name):
+        self.client.request(name, "GET", "/goals/goal/list", params={
+            "limit": 20,
+            "category__in": ",".join(map(str, self.rnd.sample(self.categories, min(2, len(self.categories))))),
+            "status__in": ",".join(map(str, self.rnd.sample(STATUSES, 2))),
+            "priority": self.rnd.choice(PRIORITIES),
+        })
+
+    def goal_search(self, name):
+        self.client.request(name, "GET", "/goals/goal/list", params={"limit": 20, "search": self.rnd.choice(WORDS)})
+
+    def goal_detail(self, name):
+        self.client.request(name, "GET", f"/goals/goal/{self.rnd.choice(self.goals)}")
+
+    def create_goal(self, name):
+        goal = self.client.request(name, "POST", "/goals/goal/create", json={
+            "title": self.words(3),
+            "description": self.words(10),
+            "category": self.rnd.choice(self.categories),
+            "status": self.rnd.choice(STATUSES),
+            "priority": self.rnd.choice(PRIORITIES),
+        })
+        if goal:
+            self.goals.append(goal["id"])
+
+    def edit_goal(self, name):
+        self.client.request(name, "PATCH", f"/goals/goal/{self.rnd.choice(self.goals)}", json={
+            "status": self.rnd.choice(STATUSES), "title": self.words(3),
+        })
+
+    def comment_list(self, name):
+        self.client.request(name, "GET", "/goals/goal_comment/list", params={
+            "goal": self.rnd.choice(self.goals), "limit": 20,
+        })
+
+    def create_comment(self, name):
+        self.client.request(name, "POST", "/goals/goal_comment/create", json={
+            "text": self.words(6), "goal": self.rnd.choice(self.goals),
+        })
+
+
+# (endpoint name in the report, action, weight)
+ACTIONS = (
+    ("core/login", VirtualUser.login, 2),
+    ("board/list", VirtualUser.board_list, 10),
+    ("board/<pk>", VirtualUser.board_detail, 5),
+    ("board/<pk>/summary", VirtualUser.board_summary, 3),
+    ("goal_category/list", VirtualUser.category_list, 10),
+    ("goal/list", VirtualUser.goal_list, 25),
+    ("goal/list filtered", VirtualUser.goal_list_filtered, 10),
+    ("goal/list search", VirtualUser.goal_search, 8),
+    ("goal/<pk>", VirtualUser.goal_detail, 8),
+    ("goal/create", VirtualUser.create_goal, 5),
+    ("goal/<pk> edit", VirtualUser.edit_goal, 5),
+    ("goal_comment/list", VirtualUser.comment_list, 5),
+    ("goal_comment/create", VirtualUser.create_comment, 4),
+)
+WEIGHTS = [weight for _, _, weight in ACTIONS]
@@ -0,0 +1,47 @@
+"""
+PostgreSQL backend that takes connections from an in-process pool (``todolist.db.pool``).
+
+Configured with ``OPTIONS["pool"] = {"size": 10, "timeout": 30, "max_idle": 300}``. Django closes the
+connection at the end of every request (``CONN_MAX_AGE`` must be 0), which returns it to the pool.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS
+from django.db.backends.postgresql import base
+from django.utils.asyncio import async_unsafe
+
+from todolist.db.pool import get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def __init__(self, settings_dict, alias=DEFAULT_DB_ALIAS):
+        super().__init__(settings_dict, alias)
+        if settings_dict.get('CONN_MAX_AGE'):
+            raise ImproperlyConfigured(f'Database "{alias}": CONN_MAX_AGE must be 0 with the pooled backend')
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pool', None)
+        return params
+
+    @property
+    def pool(self):
+        return get_pool(
+            self.alias, self.get_connection_params(), self.settings_dict['OPTIONS'].get('pool', {}),
+            self.settings_dict['CONN_HEALTH_CHECKS'],
+        )
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        connection, reused = self.pool.checkout(lambda: super(DatabaseWrapper, self).get_new_connection(conn_params))
+        if reused:
+            self.isolation_level = self.settings_dict['OPTIONS'].get('isolation_level', connection.isolation_level)
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        if self.in_atomic_block:
+            # Django оставляет ссылку на соединение до выхода из atomic, отдавать его другим потокам нельзя
+            self.pool.discard(self.connection)
+        else:
+            self.pool.checkin(self.connection)
@@ -0,0 +1,154 @@
+import os
+import threading
+import time
+
+from psycopg2 import OperationalError, extensions
+
+from todolist.metrics import registry
+
+
+pool_connections = registry.gauge(
+    'db_pool_connections', 'Open connections of the in-process pool', ('alias', 'state')
+)
+pool_max_size = registry.gauge('db_pool_max_size', 'Maximum number of connections of the pool', ('alias',))
+pool_checkouts = registry.counter(
+    'db_pool_checkouts_total', 'Connection checkouts, reused="true" when an idle connection was handed out',
+    ('alias', 'reused'),
+)
+pool_timeouts = registry.counter('db_pool_timeouts_total', 'Checkouts that gave up waiting', ('alias',))
+pool_discarded = registry.counter(
+    'db_pool_discarded_total', 'Connections closed by the pool (broken, expired or failed health check)', ('alias',)
+)
+pool_wait = registry.histogram(
+    'db_pool_checkout_wait_seconds', 'Time spent waiting for a connection', ('alias',),
+    buckets=(.0001, .0005, .001, .005, .01, .05, .1, .5, 1, 5),
+)
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of psycopg2 connections of one database.
+
+    ``checkout()`` hands out an idle connection (LIFO, so the warm ones are reused) or opens a new
+    one while fewer than ``size`` are open, otherwise waits up to ``timeout`` seconds.
+    """
+
+    def __init__(self, alias, size, timeout=30.0, max_idle=300.0, health_checks=True):
+        self.alias = alias
+        self.size = size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.health_checks = health_checks
+        self.idle = []
+        self.in_use = 0
+        self.condition = threading.Condition()
+        pool_max_size.set(size, alias=alias)
+
+    def checkout(self, connect):
+        """Return ``(connection, reused)``; ``connect()`` opens a new connection."""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        with self.condition:
+            while not self.idle and self.in_use >= self.size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    pool_timeouts.inc(alias=self.alias)
+                    raise OperationalError(f'Connection pool of "{self.alias}" exhausted ({self.size} connections)')
+                self.condition.wait(remaining)
+            self.in_use += 1
+            connection, released = self.idle.pop() if self.idle else (None, None)
+            self.update_gauges()
+        pool_wait.observe(time.monotonic() - started, alias=self.alias)
+
+        try:
+            if connection is not None and not self.is_usable(connection, released):
+                self.close(connection)
+                connection = None
+            reused = connection is not None
+            if connection is None:
+                connection = connect()
+        except BaseException:
+            self.release_slot()
+            raise
+
+        pool_checkouts.inc(alias=self.alias, reused=str(reused).lower())
+        return connection, reused
+
+    def checkin(self, connection):
+        """Take a connection back, rolling back an unfinished transaction; broken connections are closed."""
+        try:
+            if not connection.closed and connection.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+            usable = not connection.closed \
+                and connection.info.transaction_status == extensions.TRANSACTION_STATUS_IDLE
+        except Exception:
+            usable = False
+
+        with self.condition:
+            self.in_use -= 1
+            if usable:
+                self.idle.append((connection, time.monotonic()))
+            self.update_gauges()
+            self.condition.notify()
+        if not usable:
+            self.close(connection)
+
+    def discard(self, connection):
+        """Close a checked out connection without returning it."""
+        self.close(connection)
+        self.release_slot()
+
+    def release_slot(self):
+        with self.condition:
+            self.in_use -= 1
+            self.update_gauges()
+            self.condition.notify()
+
+    def is_usable(self, connection, released):
+        if connection.closed or time.monotonic() - released > self.max_idle:
+            return False
+        if not self.health_checks:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            return True
+        except Exception:
+            return False
+
+    def close(self, connection):
+        pool_discarded.inc(alias=self.alias)
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def update_gauges(self):
+        pool_connections.set(len(self.idle), alias=self.alias, state='idle')
+        pool_connections.set(self.in_use, alias=self.alias, state='in_use')
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+_pools_pid = None
+
+
+def get_pool(alias, conn_params, options, health_checks):
+    """Pool shared by all threads of the process for one set of connection parameters."""
+    global _pools_pid
+    key = (alias, repr(sorted(conn_params.items())))
+    with _pools_lock:
+        if _pools_pid != os.getpid():
+            # Соединения родителя после fork не используются
+            _pools.clear()
+            _pools_pid = os.getpid()
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(
+                alias,
+                size=int(options.get('size', 10)),
+                timeout=float(options.get('timeout', 30)),
+                max_idle=float(options.get('max_idle', 300)),
+                health_checks=health_checks,
+            )
+        return pool
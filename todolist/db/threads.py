@@ -0,0 +1,34 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+
+@lru_cache(maxsize=None)
+def get_database_executor():
+    """Threads of ``database_sync_to_async``: each keeps its own connection, so there are ``ASYNC_DB_THREADS``."""
+    return ThreadPoolExecutor(settings.ASYNC_DB_THREADS, thread_name_prefix='database')
+
+
+# Потоки родителя не переживают fork
+os.register_at_fork(after_in_child=get_database_executor.cache_clear)
+
+
+def database_sync_to_async(func):
+    """
+    Run ``func`` in the database thread pool instead of the single thread-sensitive thread.
+
+    Each pool thread has its own database connection; stale connections are closed around the call
+    (returned to the pool with the pooled backend). The pool is bounded by ``ASYNC_DB_THREADS``
+    rather than the loop's default executor, so a process never holds more connections than that.
+    """
+    def wrapper(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(wrapper, thread_sensitive=False, executor=get_database_executor())
@@ -0,0 +1,331 @@
+"""
+Metrics registry rendered in the Prometheus text format at ``/metrics``.
+
+Every process keeps its own values. With ``METRICS_DIR`` the processes also write them to that
+directory (``FileStore``) and ``/metrics`` of any gunicorn worker answers with the sum over all of
+them, so scrapes through the load balancer see one consistent set of series.
+"""
+import atexit
+import fcntl
+import hmac
+import json
+import math
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def get_key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name}: expected labels {self.labelnames}, got {tuple(labels)}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def snapshot(self):
+        """``{label values: value}`` copy for the ``FileStore``."""
+        with self._lock:
+            return dict(self._values)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    @staticmethod
+    def merge(value, other):
+        return value + other
+
+    def samples(self, values=None):
+        """Yield ``(suffix, labels, value)`` of ``values`` (own values by default)."""
+        if values is None:
+            values = self.snapshot()
+        for key, value in values.items():
+            yield '', dict(zip(self.labelnames, key)), value
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self.get_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        key = self.get_key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self.get_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    type = 'histogram'
+    default_buckets = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+
+    def __init__(self, name, documentation, labelnames=(), buckets=None):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets or self.default_buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self.get_key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][index] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {key: [list(state[0]), state[1], state[2]] for key, state in self._values.items()}
+
+    @staticmethod
+    def merge(value, other):
+        return [[a + b for a, b in zip(value[0], other[0])], value[1] + other[1], value[2] + other[2]]
+
+    def samples(self, values=None):
+        if values is None:
+            values = self.snapshot()
+        for key, (counts, total, count) in values.items():
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield '_bucket', {**labels, 'le': '+Inf' if bound == math.inf else repr(float(bound))}, cumulative
+            yield '_sum', labels, total
+            yield '_count', labels, count
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self.store = None
+
+    def register(self, metric):
+        """Add ``metric`` or return the one already registered under its name (modules may be reloaded)."""
+        if self.store is None and settings.METRICS_DIR:
+            self.store = FileStore(self, settings.METRICS_DIR)
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f'Metric {metric.name} is already registered with another type or labels')
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=None):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def metrics(self):
+        with self._lock:
+            return dict(self._metrics)
+
+    def snapshot(self):
+        return {name: metric.snapshot() for name, metric in self.metrics().items()}
+
+    def reset(self):
+        for metric in self.metrics().values():
+            metric.reset()
+
+    def render(self):
+        values = self.store.collect() if self.store is not None else {}
+        lines = []
+        for metric in sorted(self.metrics().values(), key=lambda metric: metric.name):
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            for suffix, labels, value in metric.samples(values.get(metric.name) if self.store is not None else None):
+                lines.append(f'{metric.name}{suffix}{format_labels(labels)} {format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"'))
+        for name, value in labels.items()
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class FileStore:
+    """
+    Values of all processes sharing ``directory``, for servers with several worker processes.
+
+    Each process writes a snapshot of its registry to ``<pid>-<n>.json`` every ``interval`` seconds
+    and at exit, and holds an ``flock`` on the ``.lock`` file next to it while it runs. ``collect()``
+    sums counters and histograms of every process and gauges of the running ones; snapshots of
+    exited processes (recycled workers) are folded into ``exited.json``, so counters never go back.
+    Clear the directory when the server starts (see gunicorn.conf.py).
+    """
+    interval = 1.0
+
+    def __init__(self, registry, directory):
+        self.registry = registry
+        self.directory = directory
+        self.lock_file = None
+        self.path = None
+        self.write_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.start()
+        atexit.register(self.write)
+        os.register_at_fork(after_in_child=self.after_fork)
+
+    def start(self):
+        name = f'{os.getpid()}-{time.time_ns()}'
+        self.path = os.path.join(self.directory, f'{name}.json')
+        with self.directory_lock():
+            self.lock_file = open(os.path.join(self.directory, f'{name}.lock'), 'w')
+            fcntl.flock(self.lock_file, fcntl.LOCK_EX)
+        threading.Thread(target=self.run, name='metrics-store', daemon=True).start()
+
+    def after_fork(self):
+        # Значения родителя уже записаны в его файл
+        self.lock_file.close()
+        self.write_lock = threading.Lock()
+        self.registry.reset()
+        self.start()
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            self.write()
+
+    def write(self):
+        data = {name: [[list(key), value] for key, value in values.items()]
+                for name, values in self.registry.snapshot().items()}
+        with self.write_lock:
+            tmp = f'{self.path}.tmp'
+            with open(tmp, 'w') as file:
+                json.dump(data, file)
+            os.replace(tmp, self.path)
+
+    def directory_lock(self):
+        return FileLock(os.path.join(self.directory, '.lock'))
+
+    def collect(self):
+        """``{metric name: {label values: value}}`` summed over the processes."""
+        self.write()
+        metrics = self.registry.metrics()
+        counters, gauges = {}, {}
+        with self.directory_lock():
+            exited = self.read(os.path.join(self.directory, 'exited.json'))
+            folded = False
+            for name in os.listdir(self.directory):
+                if not name.endswith('.lock') or name == '.lock':
+                    continue
+                base = os.path.join(self.directory, name[:-len('.lock')])
+                data = self.read(f'{base}.json')
+                if base + '.json' != self.path and self.exited(f'{base}.lock'):
+                    self.add(exited, data, metrics, gauges=False)
+                    for suffix in ('.json', '.lock'):
+                        if os.path.exists(base + suffix):
+                            os.remove(base + suffix)
+                    folded = True
+                    continue
+                self.add(counters, data, metrics, gauges=False)
+                self.add(gauges, data, metrics, gauges=True)
+            if folded:
+                with open(os.path.join(self.directory, 'exited.json'), 'w') as file:
+                    json.dump(exited, file)
+        self.add(counters, exited, metrics, gauges=False)
+        return {
+            name: {tuple(key): value for key, value in (counters.get(name) or gauges.get(name) or [])}
+            for name in metrics
+        }
+
+    @staticmethod
+    def exited(lock_path):
+        with open(lock_path) as file:
+            try:
+                fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+        return True
+
+    @staticmethod
+    def read(path):
+        try:
+            with open(path) as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    @staticmethod
+    def add(total, data, metrics, gauges):
+        """Add the series of ``data`` to ``total`` (``{name: [[key, value], ...]}``), gauges or the rest."""
+        for name, series in data.items():
+            metric = metrics.get(name)
+            if metric is None or (metric.type == 'gauge') != gauges:
+                continue
+            merged = {tuple(key): value for key, value in total.get(name, [])}
+            for key, value in series:
+                key = tuple(key)
+                merged[key] = metric.merge(merged[key], value) if key in merged else value
+            total[name] = [[list(key), value] for key, value in merged.items()]
+
+
+class FileLock:
+    def __init__(self, path):
+        self.path = path
+
+    def __enter__(self):
+        self.file = open(self.path, 'a')
+        fcntl.flock(self.file, fcntl.LOCK_EX)
+
+    def __exit__(self, *args):
+        self.file.close()
+
+
+registry = Registry()
+
+
+def metrics_view(request):
+    token = settings.METRICS_TOKEN
+    if not token:
+        # Без токена метрики открыты только при DEBUG: /metrics доступен и снаружи через /api/
+        if not settings.DEBUG:
+            raise Http404
+    elif not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,179 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils.deprecation import MiddlewareMixin
+
+from todolist.metrics import registry
+
+
+request_duration = registry.histogram(
+    'http_request_duration_seconds', 'Time from the first middleware to the response', ('view', 'method', 'status'),
+)
+request_phase = registry.histogram(
+    'http_request_phase_seconds', 'Time spent in the view, serialization, rendering and SQL', ('view', 'phase'),
+)
+request_queries = registry.histogram(
+    'http_request_db_queries', 'SQL queries per request', ('view',), buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+response_size = registry.histogram(
+    'http_response_size_bytes', 'Size of the response body', ('view',),
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+
+_current = ContextVar('request_timing', default=None)
+
+
+def get_request_timing():
+    return _current.get()
+
+
+class RequestTiming:
+    """
+    Timings of the current request; shared with worker threads through the context.
+
+    Set ``sql`` to a list to also collect ``(offset_ms, duration_ms, sql)`` of every query.
+    """
+    __slots__ = ('started', 'queries', 'phases', 'view_started', 'sql')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.phases = {}
+        self.view_started = None
+        self.sql = None
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+
+@contextmanager
+def timed(phase):
+    """Add the duration of the block to ``phase`` of the current request (no-op outside a request)."""
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(phase, time.perf_counter() - started)
+
+
+def count_queries(execute, sql, params, many, context):
+    timing = _current.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started
+        timing.queries += 1
+        timing.add('db', duration)
+        if timing.sql is not None:
+            offset = (started - timing.started) * 1000
+            timing.sql.append((round(offset, 3), round(duration * 1000, 3), f'{sql} [many]' if many else sql))
+
+
+def install_query_counter(connection, **kwargs):
+    # Обёртка живёт в объекте соединения потока и переживает переподключения
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+connection_created.connect(install_query_counter)
+
+
+class RequestMetricsMiddleware(MiddlewareMixin):
+    """
+    Record SQL queries, view, serialization and rendering time and response size of every request.
+
+    Latencies go to histograms per URL name (``goals:goal-list``) served at ``/metrics``; with
+    ``SERVER_TIMING`` the same numbers are sent in the ``Server-Timing`` header. Put it first in
+    ``MIDDLEWARE``.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        for connection in connections.all(initialized_only=True):
+            install_query_counter(connection)
+        if self._is_coroutine:
+            # Синхронные process_* под ASGI вызывались бы через поток на каждый запрос
+            self.process_view = self.aprocess_view
+            self.process_template_response = self.aprocess_template_response
+
+    def __call__(self, request):
+        if self._is_coroutine:
+            return self.acall(request)
+        timing = RequestTiming()
+        token = _current.set(timing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timing)
+
+    async def acall(self, request):
+        timing = RequestTiming()
+        token = _current.set(timing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timing)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        self.start_view()
+
+    def process_template_response(self, request, response):
+        return self.finish_view(response)
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        self.start_view()
+
+    async def aprocess_template_response(self, request, response):
+        return self.finish_view(response)
+
+    @staticmethod
+    def start_view():
+        timing = _current.get()
+        if timing is not None:
+            timing.view_started = time.perf_counter()
+
+    @staticmethod
+    def finish_view(response):
+        timing = _current.get()
+        if timing is not None and timing.view_started is not None:
+            # Ответ DRF рендерится после этого вызова
+            finished = time.perf_counter()
+            timing.add('view', finished - timing.view_started)
+            timing.view_started = None
+            response.add_post_render_callback(lambda _: timing.add('render', time.perf_counter() - finished))
+        return response
+
+    def finish(self, request, response, timing):
+        total = time.perf_counter() - timing.started
+        if timing.view_started is not None:
+            # Представление без отложенного рендеринга (HttpResponse)
+            timing.add('view', time.perf_counter() - timing.view_started)
+
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match is not None else '<unresolved>'
+        request_duration.observe(total, view=view, method=request.method, status=f'{response.status_code // 100}xx')
+        for phase, seconds in timing.phases.items():
+            request_phase.observe(seconds, view=view, phase=phase)
+        request_queries.observe(timing.queries, view=view)
+        if not response.streaming:
+            response_size.observe(len(response.content), view=view)
+
+        if settings.SERVER_TIMING:
+            entries = [f'{phase};dur={seconds * 1000:.1f}' for phase, seconds in timing.phases.items() if phase != 'db']
+            entries.insert(0, f'db;dur={timing.phases.get("db", 0) * 1000:.1f};desc="{timing.queries} queries"')
+            entries.append(f'total;dur={total * 1000:.1f}')
+            response['Server-Timing'] = ', '.join(entries)
+        return response
@@ -26,6 +26,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'social_django',
     'django_filters',
@@ -42,11 +43,13 @@ if DEBUG:
 AUTH_USER_MODEL = "core.User"
 
 MIDDLEWARE = [
+    'todolist.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -75,14 +78,27 @@ WSGI_APPLICATION = 'todolist.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.1/ref/settings/#databases
 
+# DB_POOL_SIZE > 0 switches to the pooled backend (todolist/db): connections are returned to an
+# in-process pool after each request. Otherwise CONN_MAX_AGE keeps a connection per thread open.
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 0))
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql_psycopg2",
+        "ENGINE": "todolist.db" if DB_POOL_SIZE else "django.db.backends.postgresql_psycopg2",
         "HOST": os.environ.get("DB_HOST", "localhost"),
         "NAME": os.environ.get("POSTGRES_NAME", "postgres"),
         "PORT": os.environ.get("DB_PORT", "5432"),
         "USER": os.environ.get("DB_USER", "postgres"),
         "PASSWORD": os.environ.get("DB_PASSWORD", "postgres"),
+        "CONN_MAX_AGE": 0 if DB_POOL_SIZE else int(os.environ.get("CONN_MAX_AGE", 60)),
+        "CONN_HEALTH_CHECKS": os.environ.get("CONN_HEALTH_CHECKS", "true").lower() in ("1", "true", "yes"),
+        "OPTIONS": {
+            "pool": {
+                "size": DB_POOL_SIZE,
+                "timeout": float(os.environ.get("DB_POOL_TIMEOUT", 30)),
+                "max_idle": float(os.environ.get("DB_POOL_MAX_IDLE", 300)),
+            },
+        } if DB_POOL_SIZE else {},
     },
 }
 
@@ -146,3 +162,78 @@ REST_FRAMEWORK = {
 }
 
 BOT_TOKEN = os.environ.get("BOT_TOKEN")
+# Secret token of setWebhook; the webhook (bot/webhook) is disabled while it is empty
+TG_WEBHOOK_SECRET = os.environ.get("TG_WEBHOOK_SECRET", "")
+# Bot API server; a local server (telegram-bot-api or the fake one of bench_bot) can be used instead
+TG_API_URL = os.environ.get("TG_API_URL", "https://api.telegram.org")
+# Bot API transport (bot/tg/transport.py): timeouts in seconds, retries with jittered backoff,
+# keep-alive connections per process
+TG_CONNECT_TIMEOUT = float(os.environ.get("TG_CONNECT_TIMEOUT", 5))
+TG_READ_TIMEOUT = float(os.environ.get("TG_READ_TIMEOUT", 15))
+TG_RETRIES = int(os.environ.get("TG_RETRIES", 3))
+TG_BACKOFF = float(os.environ.get("TG_BACKOFF", 0.5))
+TG_BACKOFF_MAX = float(os.environ.get("TG_BACKOFF_MAX", 30))
+TG_POOL_SIZE = int(os.environ.get("TG_POOL_SIZE", 10))
+# Replies sent while a web request waits (account verification): one attempt, connect and read
+# timeout in seconds, well below the proxy timeout
+TG_REPLY_TIMEOUT = float(os.environ.get("TG_REPLY_TIMEOUT", 3))
+# Send limits of Telegram: about 30 messages per second overall and 1 per second in a chat
+TG_SEND_RATE = float(os.environ.get("TG_SEND_RATE", 30))
+TG_SEND_BURST = int(os.environ.get("TG_SEND_BURST", 30))
+TG_CHAT_SEND_RATE = float(os.environ.get("TG_CHAT_SEND_RATE", 1))
+TG_CHAT_SEND_BURST = int(os.environ.get("TG_CHAT_SEND_BURST", 3))
+
+GOALS_BULK_MAX_ITEMS = int(os.environ.get("GOALS_BULK_MAX_ITEMS", 500))
+# Deleting a board or category with more active goals than this archives them in the background
+# (see the run_archive_worker command) in chunks of GOALS_ARCHIVE_CHUNK_SIZE goals
+GOALS_ARCHIVE_BACKGROUND_THRESHOLD = int(os.environ.get("GOALS_ARCHIVE_BACKGROUND_THRESHOLD", 5000))
+GOALS_ARCHIVE_CHUNK_SIZE = int(os.environ.get("GOALS_ARCHIVE_CHUNK_SIZE", 1000))
+# A job whose chunk fails this many times in a row is marked failed and skipped by the worker
+GOALS_ARCHIVE_MAX_ATTEMPTS = int(os.environ.get("GOALS_ARCHIVE_MAX_ATTEMPTS", 5))
+GOALS_SYNC_MAX_ITEMS = int(os.environ.get("GOALS_SYNC_MAX_ITEMS", 1000))
+# The sync cursor lags behind now() so rows written by transactions still in flight are not skipped
+GOALS_SYNC_OVERLAP_SECONDS = int(os.environ.get("GOALS_SYNC_OVERLAP_SECONDS", 5))
+
+# Serve goal, category and board lists with async views (goals/async_views.py); enable under ASGI
+ASYNC_LIST_VIEWS = os.environ.get("ASYNC_LIST_VIEWS", "false").lower() in ("1", "true", "yes")
+# Threads that run the database work of async views and of the bot runtime in each process. Every
+# thread keeps its own connection (or takes one from the pool with DB_POOL_SIZE), so a server uses up to
+# workers * (ASYNC_DB_THREADS + 1) connections, which must stay below max_connections of Postgres
+ASYNC_DB_THREADS = int(os.environ.get("ASYNC_DB_THREADS", 8))
+
+# Bearer token required by /metrics (empty - /metrics is served only with DEBUG)
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+# Directory where the worker processes of one server share their metrics (todolist/metrics.py);
+# empty - /metrics shows the values of the process that answers
+METRICS_DIR = os.environ.get("METRICS_DIR", "")
+# Send SQL, view, serialization and rendering time of each request in the Server-Timing header
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "true").lower() in ("1", "true", "yes")
+
+# Staff requests with the X-Profile header or ?_profile run under cProfile (core/profiling.py).
+# With PROFILING_SLOW_MS a PROFILING_SAMPLE_RATE share of all requests is profiled and stored when slower
+PROFILING_SLOW_MS = float(os.environ.get("PROFILING_SLOW_MS", 0))
+PROFILING_SAMPLE_RATE = float(os.environ.get("PROFILING_SAMPLE_RATE", 0.01))
+# Number of most recent profiles kept
+PROFILING_KEEP = int(os.environ.get("PROFILING_KEEP", 200))
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+# Seconds to cache goal, category and board list responses per user (0 - disabled).
+# Enable only with a cache backend shared by all workers, e.g.
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache CACHE_LOCATION=redis://redis:6379
+GOALS_LIST_CACHE_TIMEOUT = int(os.environ.get("GOALS_LIST_CACHE_TIMEOUT", 0))
+
+# Seconds to cache a user's board roles across requests (0 - per request only).
+# Enable only with a cache backend shared by all workers.
+BOARD_MEMBERSHIP_CACHE_TIMEOUT = int(os.environ.get("BOARD_MEMBERSHIP_CACHE_TIMEOUT", 0))
+
+# Seconds a bot process keeps the linked TgUser of a chat in memory (0 - disabled), at most
+# TG_USER_CACHE_SIZE chats. Changes are announced through the cache backend, so enable only with
+# a backend shared by the web and bot processes.
+TG_USER_CACHE_TIMEOUT = int(os.environ.get("TG_USER_CACHE_TIMEOUT", 0))
+TG_USER_CACHE_SIZE = int(os.environ.get("TG_USER_CACHE_SIZE", 10000))
@@ -2,12 +2,15 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 
+from todolist.metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('core/', include(('core.urls', 'core'))),
     path('goals/', include(('goals.urls', 'goals'))),
     path('bot/', include(('bot.urls', 'bot'))),
     path('oauth/', include('social_django.urls', namespace='social')),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 if settings.DEBUG: